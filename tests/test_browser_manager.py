@@ -0,0 +1,25 @@
+"""Tests for the dashboard input mapping in browser_manager."""
+
+import pytest
+
+pytest.importorskip("flask_socketio")
+
+from webEvalAgent.src.browser_manager import PlaywrightBrowserManager
+
+
+@pytest.mark.parametrize(
+    "details, expected",
+    [
+        ({}, 0),
+        ({"altKey": True}, 1),
+        ({"ctrlKey": True}, 2),
+        ({"metaKey": True}, 4),
+        ({"shiftKey": True}, 8),
+        ({"altKey": True, "ctrlKey": True, "metaKey": True, "shiftKey": True}, 15),
+        ({"ctrlKey": True, "shiftKey": False, "altKey": None}, 2),
+    ],
+)
+def test_map_modifiers(details, expected):
+    # The mapping needs no browser, so skip the singleton's __init__
+    manager = PlaywrightBrowserManager.__new__(PlaywrightBrowserManager)
+    assert manager._map_modifiers(details) == expected
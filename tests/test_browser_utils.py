@@ -0,0 +1,205 @@
+"""Tests for the browser_utils capture helpers and concurrent runs on the pooled browser."""
+
+import asyncio
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("browser_use")
+pytest.importorskip("playwright")
+
+from webEvalAgent.src import browser_utils
+
+
+@pytest.fixture(scope="module")
+def chromium():
+    """Skip the test unless Playwright can launch Chromium in this environment."""
+
+    async def probe():
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch()
+            await browser.close()
+
+    try:
+        asyncio.run(probe())
+    except Exception:
+        pytest.skip("Chromium is not installed")
+
+
+def _extension_filter(url):
+    """The per-extension loop _is_loggable_url's regex replaced."""
+    if "/node_modules/" in url:
+        return False
+    for ext in [".js", ".css", ".woff", ".woff2", ".ttf", ".eot", ".svg",
+                ".png", ".jpg", ".jpeg", ".gif", ".ico", ".map"]:
+        if url.endswith(ext) or f"{ext}?" in url:
+            return False
+    return True
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://example.com/api/users",
+        "https://example.com/api/data.json",
+        "https://example.com/static/app.js",
+        "https://example.com/static/app.js?v=3",
+        "https://example.com/static/app.jsx",
+        "https://example.com/static/app.js/api",
+        "https://example.com/style.css",
+        "https://example.com/fonts/a.woff",
+        "https://example.com/fonts/a.woff2?x=1",
+        "https://example.com/img/logo.JPG",
+        "https://example.com/img/logo.jpeg",
+        "https://example.com/app.js.map",
+        "https://example.com/search?q=a.png",
+        "https://example.com/node_modules/pkg/index",
+    ],
+)
+def test_is_loggable_url_matches_extension_filter(url):
+    assert browser_utils._is_loggable_url(url) == _extension_filter(url)
+
+
+@pytest.mark.parametrize(
+    "body, content_type, expected",
+    [
+        (None, "application/json", None),
+        (b"", "application/json", ""),
+        (b'{"a": 1}', "application/json; charset=utf-8", '{"a": 1}'),
+        (b"\x89PNG", "image/png", "<4 bytes binary>"),
+    ],
+)
+def test_capture_post_data(body, content_type, expected):
+    request = SimpleNamespace(post_data_buffer=body)
+    headers = {"content-type": content_type}
+    assert browser_utils._capture_post_data(request, headers) == expected
+
+
+def test_capture_post_data_truncates_long_bodies():
+    body = b"x" * (browser_utils.MAX_POST_LOG + 10)
+    request = SimpleNamespace(post_data_buffer=body)
+    post_data = browser_utils._capture_post_data(request, {"content-type": "text/plain"})
+    assert post_data == "x" * browser_utils.MAX_POST_LOG + "...[truncated]"
+
+
+class _FakeRequest:
+    """Playwright request stand-in whose body must not be read."""
+
+    url = "https://example.com/api/login"
+    method = "POST"
+    headers = {"content-type": "application/json"}
+    resource_type = "fetch"
+
+    @property
+    def post_data_buffer(self):
+        raise AssertionError("post data was read with capture disabled")
+
+    def is_navigation_request(self):
+        return False
+
+
+def test_handle_request_skips_post_data_when_capture_is_off(monkeypatch):
+    monkeypatch.setattr(browser_utils, "CAPTURE_POST_DATA", False)
+    task = browser_utils.TaskContext(tool_call_id="test")
+
+    browser_utils.handle_request(task, _FakeRequest())
+
+    (entry,) = task.network_requests.values()
+    assert entry.url == _FakeRequest.url
+    assert entry.post_data is None
+
+
+def test_failed_run_logs_traceback_without_subscribers(monkeypatch, caplog):
+    async def no_browser(headless):
+        raise RuntimeError("no browser today")
+
+    monkeypatch.setattr(browser_utils, "_get_browser", no_browser)
+    monkeypatch.setattr(browser_utils, "has_subscribers", lambda: False)
+
+    result = asyncio.run(browser_utils.run_browser_task("task", tool_call_id="t1"))
+
+    assert result["result"] == "Error in run_browser_task: no browser today"
+    (record,) = caplog.records
+    assert record.getMessage() == "run_browser_task t1 failed"
+    assert isinstance(record.exc_info[1], RuntimeError)
+
+
+def test_overlay_reaches_top_frame_without_console_noise(chromium):
+    from playwright.async_api import async_playwright
+
+    async def main():
+        async with async_playwright() as p:
+            browser = await p.chromium.launch()
+            try:
+                context = await browser.new_context()
+                task = browser_utils.TaskContext(tool_call_id="overlay")
+                context.on(
+                    "console", partial(browser_utils.handle_console_message, task)
+                )
+                await browser_utils.setup_context_agent_controls(context, task)
+                page = await context.new_page()
+                await page.goto(
+                    "data:text/html,<p>app</p><iframe srcdoc='<p>frame</p>'></iframe>"
+                )
+                has_host = "!!document.getElementById('agent-control-host')"
+                in_page = await page.evaluate(has_host)
+                in_frame = await page.frames[1].evaluate(has_host)
+                # Give any late overlay logging a chance to arrive
+                await page.wait_for_timeout(200)
+                return in_page, in_frame, list(task.console_logs)
+            finally:
+                await browser.close()
+
+    in_page, in_frame, console_logs = asyncio.run(main())
+
+    assert in_page
+    assert not in_frame
+    assert console_logs == []
+
+
+class _RecordingAgent:
+    """Agent stand-in that records the Playwright context it is driving."""
+
+    seen = None  # Playwright contexts, in the order the agents started
+    both_started = None  # Set once every agent has its context
+
+    def __init__(self, task, llm, browser, browser_context, **kwargs):
+        self.browser_context = browser_context
+
+    async def run(self):
+        session = await self.browser_context.get_session()
+        self.seen.append(session.context)
+        if len(self.seen) == 2:
+            self.both_started.set()
+        # Keep this run going until the other one is in flight too
+        await asyncio.wait_for(self.both_started.wait(), timeout=30)
+        return "done"
+
+
+def test_concurrent_runs_get_distinct_contexts(chromium, monkeypatch):
+    monkeypatch.setattr(browser_utils, "Agent", _RecordingAgent)
+    monkeypatch.setattr(
+        browser_utils, "_get_llm", lambda model: SimpleNamespace(model=model)
+    )
+
+    async def main():
+        monkeypatch.setattr(_RecordingAgent, "seen", [])
+        monkeypatch.setattr(_RecordingAgent, "both_started", asyncio.Event())
+        monkeypatch.setattr(browser_utils, "task_semaphore", asyncio.Semaphore(2))
+        try:
+            return await browser_utils.run_many(["first", "second"], max_parallel=2)
+        finally:
+            await browser_utils.shutdown_browser_pool()
+
+    results = asyncio.run(main())
+
+    assert [r["result"] for r in results] == ["done", "done"]
+    first, second = _RecordingAgent.seen
+    assert first is not second
+    # Only one of the overlapping runs owns the dashboard view, and it is
+    # released once both are done
+    assert browser_utils.interactive_task is None
+    assert browser_utils.active_cdp_session is None
@@ -0,0 +1,36 @@
+"""Tests for the log server's payload formatting and Socket.IO codec."""
+
+import pytest
+
+pytest.importorskip("flask_socketio")
+
+from webEvalAgent.src import log_server
+
+
+def test_format_log_entry_applies_args():
+    entry = log_server._format_log_entry("NET REQ [%s]: %s", "➡️", "network", ("GET", "/api"))
+    assert entry == {"data": "➡️ NET REQ [GET]: /api", "type": "network"}
+
+
+def test_format_log_entry_falls_back_when_args_do_not_fit():
+    entry = log_server._format_log_entry("100% done %s %s", "✅", "status", ("a",))
+    assert entry == {"data": "✅ 100% done %s %s ('a',)", "type": "status"}
+
+
+def test_format_log_entry_leaves_message_alone_without_args():
+    entry = log_server._format_log_entry("100% done", "✅", "status")
+    assert entry["data"] == "✅ 100% done"
+
+
+def test_orjson_codec_round_trip():
+    pytest.importorskip("orjson")
+    payload = ["log_batch", [{"data": "🖥️ CONSOLE [log]: héllo", "type": "console"}]]
+    encoded = log_server._OrjsonCodec.dumps(payload, separators=(",", ":"))
+    assert isinstance(encoded, str)
+    assert log_server._OrjsonCodec.loads(encoded) == payload
+
+
+def test_orjson_codec_falls_back_to_json_for_non_str_keys():
+    pytest.importorskip("orjson")
+    encoded = log_server._OrjsonCodec.dumps({1: "a"})
+    assert log_server._OrjsonCodec.loads(encoded) == {"1": "a"}
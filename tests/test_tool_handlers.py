@@ -0,0 +1,63 @@
+"""Tests for the evaluation report built from a run's captured entries."""
+
+import pytest
+
+pytest.importorskip("browser_use")
+pytest.importorskip("mcp.server.fastmcp")
+
+from webEvalAgent.src.browser_utils import ConsoleEntry, NetworkRequestEntry
+from webEvalAgent.src.tool_handlers import format_agent_result
+
+RESULT = (
+    "AgentHistoryList(all_results=[ActionResult(is_done=False, "
+    "extracted_content='🔗 Navigated to https://example.com', error=None), "
+    "ActionResult(is_done=True, extracted_content='Login works', error=None)])"
+)
+
+
+def _request(url, method, status, timestamp):
+    return NetworkRequestEntry(
+        url=url,
+        method=method,
+        headers={},
+        post_data=None,
+        timestamp=timestamp,
+        resource_type="fetch",
+        is_navigation=False,
+        id=0,
+        response_status=status,
+        response_timestamp=timestamp + 0.5,
+    )
+
+
+def test_format_agent_result_with_entries():
+    console_logs = [
+        ConsoleEntry(type="log", text="app ready", location=None, timestamp=100.0),
+        ConsoleEntry(type="error", text="boom", location=None, timestamp=101.0),
+    ]
+    network_requests = [
+        _request("https://example.com/api/me", "GET", 200, 100.5),
+        _request("https://example.com/api/login", "POST", 500, 102.0),
+    ]
+
+    report = format_agent_result(
+        RESULT, "https://example.com", "log in", console_logs, network_requests
+    )
+
+    assert "📍 Step 1: 🔗 Navigated to https://example.com" in report
+    assert "🔴 Console Errors: (1 items)\n  1. boom\n" in report
+    assert (
+        "❌ Failed Network Requests: (1 items)\n"
+        "  1. POST https://example.com/api/login - Status: 500\n"
+    ) in report
+    assert "  1. [log] app ready\n" in report
+    assert "  1. GET https://example.com/api/me - Status: 200\n" in report
+    assert "⏱️ Chronological Timeline of All Events:" in report
+
+
+def test_format_agent_result_without_entries():
+    report = format_agent_result(RESULT, "https://example.com", "log in")
+
+    assert "🔴 Console Errors" not in report
+    assert "🖥️ All Console Logs: No items found." in report
+    assert "🌐 All Network Requests: No items found." in report
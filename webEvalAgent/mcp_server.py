@@ -35,6 +35,7 @@ import asyncio
 import argparse
 import traceback
 import uuid
+from contextlib import asynccontextmanager
 from enum import Enum
 from webEvalAgent.src.utils import stop_log_server
 from webEvalAgent.src.log_server import send_log
@@ -48,6 +49,7 @@ from mcp.types import TextContent
 # Import our modules
 # from webEvalAgent.src.browser_utils import cleanup_resources # Removed import
 from webEvalAgent.src.tool_handlers import handle_web_evaluation, handle_setup_browser_state
+from webEvalAgent.src.browser_utils import shutdown_browser_pool
 
 # MCP server modules
 
@@ -55,8 +57,16 @@ from webEvalAgent.src.tool_handlers import handle_web_evaluation, handle_setup_b
 # This doesn't start a new server, just ensures none is running
 stop_log_server()
 
+@asynccontextmanager
+async def server_lifespan(server):
+    """Close the pooled browsers when the MCP server shuts down."""
+    try:
+        yield {}
+    finally:
+        await shutdown_browser_pool()
+
 # Create the MCP server
-mcp = FastMCP("Operative")
+mcp = FastMCP("Operative", lifespan=server_lifespan)
 
 # Define the browser tools
 class BrowserTools(str, Enum):
@@ -138,7 +148,25 @@ async def setup_browser_state(url: str = None, ctx: Context = None) -> list[Text
             text=f"Error executing setup_browser_state: {str(e)}\n\nTraceback:\n{tb}"
         )]
 
+def _install_uvloop():
+    """Use uvloop for the server's event loop when it is installed.
+
+    Everything the agent does is awaiting I/O (CDP round-trips, LLM calls), so
+    uvloop's cheaper awaits apply across the board on Python up to 3.12; 3.13+
+    keeps the stdlib loop. Not available on Windows. Install it with the
+    "speedups" extra.
+    """
+    if sys.platform == "win32" or sys.version_info >= (3, 13):
+        return
+    try:
+        import uvloop
+    except ImportError:
+        return
+    # uvloop.install() is deprecated; set the policy asyncio.run picks up
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 def main():
+     _install_uvloop()
      try:
          # Run the FastMCP server
          mcp.run(transport='stdio')
@@ -219,28 +219,28 @@
         // Button listeners
         pauseBtn.addEventListener('click', async () => {
             try {
-                if (typeof window.pauseAgent === 'function') {
-                    await window.pauseAgent();
+                if (typeof window.__agentRpc === 'function') {
+                    await window.__agentRpc('pauseAgent');
                     updateOverlayStatus('paused');
-                } else { console.error('window.pauseAgent is not defined'); }
+                } else { console.error('window.__agentRpc is not defined'); }
             } catch (e) { console.error('Failed to pause agent:', e); }
         });
 
         resumeBtn.addEventListener('click', async () => {
             try {
-                 if (typeof window.resumeAgent === 'function') {
-                    await window.resumeAgent();
+                 if (typeof window.__agentRpc === 'function') {
+                    await window.__agentRpc('resumeAgent');
                     updateOverlayStatus('running');
-                 } else { console.error('window.resumeAgent is not defined'); }
+                 } else { console.error('window.__agentRpc is not defined'); }
             } catch (e) { console.error('Failed to resume agent:', e); }
         });
 
         stopBtn.addEventListener('click', async () => {
             try {
-                 if (typeof window.stopAgent === 'function') {
-                    await window.stopAgent();
+                 if (typeof window.__agentRpc === 'function') {
+                    await window.__agentRpc('stopAgent');
                     updateOverlayStatus('stopped');
-                 } else { console.error('window.stopAgent is not defined'); }
+                 } else { console.error('window.__agentRpc is not defined'); }
             } catch (e) { console.error('Failed to stop agent:', e); }
         });
 
@@ -283,8 +283,8 @@
         // Check agent state periodically (relies on functions exposed on window)
         const stateCheckInterval = setInterval(async () => {
             try {
-                if (typeof window.getAgentState === 'function') {
-                    const state = await window.getAgentState();
+                if (typeof window.__agentRpc === 'function') {
+                    const state = await window.__agentRpc('getAgentState');
                     if (state.stopped) {
                         updateOverlayStatus('stopped');
                         clearInterval(stateCheckInterval); // Stop checking if agent stopped
@@ -295,7 +295,7 @@
                     }
                 } else {
                      // If function doesn't exist, stop checking
-                     // console.warn('window.getAgentState not found, stopping state check.');
+                     // console.warn('window.__agentRpc not found, stopping state check.');
                      // clearInterval(stateCheckInterval);
                 }
             } catch (e) {
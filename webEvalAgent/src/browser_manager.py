@@ -2,6 +2,7 @@
 
 import asyncio
 import socket
+import time
 from typing import Dict, Optional
 
 # Import log server functions
@@ -211,7 +212,7 @@ class PlaywrightBrowserManager:
             "type": message.type,
             "text": message.text,
             "location": message.location,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": time.monotonic()
         }
         self.console_logs.append(log_entry)
         try:
@@ -225,7 +226,7 @@ class PlaywrightBrowserManager:
             "url": request.url,
             "method": request.method,
             "headers": request.headers,
-            "timestamp": asyncio.get_event_loop().time(),
+            "timestamp": time.monotonic(),
             "resourceType": request.resource_type,
             "id": id(request)
         }
@@ -237,7 +238,7 @@ class PlaywrightBrowserManager:
 
     async def _handle_response(self, response) -> None:
         """Handle network responses."""
-        response_timestamp = asyncio.get_event_loop().time()
+        response_timestamp = time.monotonic()
         response_data = {
             "status": response.status,
             "statusText": response.status_text,
@@ -340,9 +341,6 @@ class PlaywrightBrowserManager:
                     send_log(f"Input error: Failed to send mousePressed: {press_error}", "❌", log_type='status')
                     return
                 
-                # Short delay often helps reliability
-                await asyncio.sleep(0.05)
-                
                 # Mouse Released
                 mouse_released_params = {
                     "type": "mouseReleased",
@@ -445,13 +443,8 @@ class PlaywrightBrowserManager:
 
     def _map_modifiers(self, details: Dict) -> int:
         """Maps modifier keys from frontend details to CDP modifier bitmask."""
-        modifiers = 0
-        if details.get('altKey'):
-            modifiers |= 1
-        if details.get('ctrlKey'):
-            modifiers |= 2
-        if details.get('metaKey'):
-            modifiers |= 4  # Command key on Mac
-        if details.get('shiftKey'):
-            modifiers |= 8
-        return modifiers
+        # alt=1, ctrl=2, meta=4 (Command key on Mac), shift=8
+        return (bool(details.get('altKey'))
+                | bool(details.get('ctrlKey')) << 1
+                | bool(details.get('metaKey')) << 2
+                | bool(details.get('shiftKey')) << 3)
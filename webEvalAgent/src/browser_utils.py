@@ -1,23 +1,39 @@
 #!/usr/bin/env python3
 
 import asyncio
-import json
+import base64
 import logging
 import uuid
 import warnings
 import os
+import re
+import traceback
+import itertools
+import weakref
 from typing import Dict, Any, List, Optional
-from collections import deque
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from time import monotonic as _now  # Timestamps for captured entries
 import pathlib  # Added for file reading
 
 # Import log server function
-from .log_server import send_log
+from .log_server import (
+    send_log,
+    send_log_batch,
+    send_browser_view,
+    has_subscribers,
+    socketio,
+    DEBUG_LOGS,
+    ENABLED_LOG_TYPES,
+)
 
 # Import Playwright types
 from playwright.async_api import (
     async_playwright,
     Error as PlaywrightError,
     Page as PlaywrightPage,
+    BrowserContext as PlaywrightBrowserContext,
 )
 
 # Local imports (assuming browser_manager is potentially still used for singleton logic elsewhere, or can be removed if fully replaced)
@@ -32,7 +48,7 @@ try:
     sys.stderr = open(os.devnull, 'w')
     from browser_use.agent.service import Agent
     from browser_use.browser.browser import Browser, BrowserConfig
-    from browser_use.browser.context import BrowserContext  # Import BrowserContext
+    from browser_use.browser.context import BrowserContext, BrowserContextConfig
 finally:
     sys.stdout.close()
     sys.stderr.close() 
@@ -43,30 +59,105 @@ finally:
 from langchain_anthropic import ChatAnthropic
 from langchain.globals import set_verbose
 
-# Original method will be stored here
-_original_bring_to_front = None
 
+def _configure_logging() -> None:
+    """Silence browser-use/langchain logging; runs once when the module is imported."""
+    # Set the root level directly; basicConfig would also try to add a handler
+    # (and is replaced by a no-op in the package __init__ anyway)
+    logging.root.setLevel(logging.CRITICAL)
+    # Then configure specific loggers
+    for logger_name in ("browser_use", "agent", "browser"):
+        logging.getLogger(logger_name).setLevel(logging.CRITICAL)
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    set_verbose(False)
+
+
+_configure_logging()
+
+# Failed runs are also written to stderr, since the dashboard drops logs while
+# nobody is connected (stdout is the MCP transport). Bound to the real stderr
+# now, before the log server thread points sys.stderr at devnull
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(_stderr))
+logger.setLevel(logging.ERROR)
+logger.propagate = False
 
 # This prevents the browser window from stealing focus during execution.
 async def _no_bring_to_front(self, *args, **kwargs):
     return None
 
 
-# We'll apply and remove the patch in run_browser_task
+# Patched once at import (and kept for the life of the process) rather than
+# saved/restored around every run, which raced between concurrent tasks
+_original_bring_to_front = PlaywrightPage.bring_to_front
+PlaywrightPage.bring_to_front = _no_bring_to_front
+
 
 # Global variables
-agent_instance = None  # Store agent instance
-original_create_context: Optional[callable] = None  # Store original patched method
+# The CDP session and screencast flag belong to the interactive run (see
+# interactive_task); no other run writes them
 active_cdp_session = None  # Store active CDP session for input handling
 active_screencast_running = False  # Track if screencast is running
 browser_task_loop = None  # Store the asyncio loop used by run_browser_task
-screenshot_task = None  # Store the periodic screenshot task
 
 # Define the maximum number of logs/requests to keep
 MAX_LOG_ENTRIES = 1000  # Increased from 10 to allow more log entries
 
+# Maximum number of step screenshots kept per task (base64 JPEGs, ~100 KB each)
+MAX_SCREENSHOTS = 100
+
+# Maximum number of request body bytes to decode and keep per request
+MAX_POST_LOG = 4096
+
+# Keep request bodies on captured entries. Off by default: nothing in the
+# report uses them, and uploads would otherwise be sliced and decoded per request
+CAPTURE_POST_DATA = os.environ.get("WEB_EVAL_CAPTURE_POST_DATA") == "1"
+
+# Request bodies with these content types are decoded as text; anything else
+# (images, multipart uploads, protobuf...) is only recorded by size
+TEXT_POST_CONTENT_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-www-form-urlencoded",
+)
+
+# Download full response bodies to measure responses without a content-length
+# header. Off by default: it pulls every captured body back over CDP.
+CAPTURE_RESPONSE_BODY_SIZE = os.environ.get("WEB_EVAL_CAPTURE_BODY_SIZE") == "1"
+
+# Bound on response body downloads awaiting CDP at once, so a burst of requests
+# on a busy page can't flood the Playwright connection and starve the agent
+MAX_CONCURRENT_NETWORK_HANDLERS = 32
+network_handler_semaphore = asyncio.Semaphore(MAX_CONCURRENT_NETWORK_HANDLERS)
+
+# Strong references to in-flight body measurements: the event loop only keeps
+# weak references to tasks, so an unreferenced one can be collected mid-run
+_pending_tasks: set = set()
+
+# Seconds to wait for each browser teardown step before giving up on it
+CLEANUP_TIMEOUT = 5.0
+
+# Bound on agent runs sharing the pooled browser at once, across every caller
+# (MCP tool calls as well as run_many); further runs wait for a free slot.
+# Concurrent runs are isolated by their own Playwright context each (handed to
+# MonitoredBrowserContext) and only one of them drives the dashboard view and
+# input (interactive_task). Set to 1 to run tool calls strictly one at a time
+MAX_CONCURRENT_TASKS = int(os.environ.get("WEB_EVAL_MAX_CONCURRENT_TASKS", "4"))
+task_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+
 
 # --- URL Filtering for Network Requests ---
+# node_modules paths and common static file types (matched at the end of the
+# URL or before a query string); one compiled search covers every pattern
+_STATIC_FILE_RE = re.compile(
+    r"/node_modules/|\.(?:js|css|woff2?|ttf|eot|svg|png|jpe?g|gif|ico|map)(?:\?|$)"
+)
+
+# Resource types whose requests are captured (XHR/fetch API traffic only)
+_LOGGED_RESOURCE_TYPES = frozenset({"xhr", "fetch"})
+
+
 def should_log_network_request(request) -> bool:
     """Determine if a network request should be logged based on its type and URL.
 
@@ -76,252 +167,375 @@ def should_log_network_request(request) -> bool:
     Returns:
         bool: True if the request should be logged, False if it should be filtered out
     """
-    url = request.url
-    if "/node_modules/" in url:
-        return False
-
     # Only log XHR requests
-    if request.resource_type != "xhr" and request.resource_type != "fetch":
+    if request.resource_type not in _LOGGED_RESOURCE_TYPES:
         return False
 
-    # Skip common static file types
-    extensions_to_filter = [
-        ".js",
-        ".css",
-        ".woff",
-        ".woff2",
-        ".ttf",
-        ".eot",
-        ".svg",
-        ".png",
-        ".jpg",
-        ".jpeg",
-        ".gif",
-        ".ico",
-        ".map",
-    ]
-
-    for ext in extensions_to_filter:
-        if url.endswith(ext) or f"{ext}?" in url:  # Handle URLs with query params
-            return False
-
     # By default, log all XHR requests that weren't filtered
-    return True
+    return _is_loggable_url(request.url)
+
+
+# Polling pages hit the same URLs over and over, so the URL checks are cached
+@lru_cache(maxsize=4096)
+def _is_loggable_url(url: str) -> bool:
+    # Skip node_modules and common static file types
+    return _STATIC_FILE_RE.search(url) is None
+
+
+@dataclass(slots=True)
+class ConsoleEntry:
+    """A captured console message or page/request error."""
+
+    type: str
+    text: str
+    location: Any  # Playwright location dict, a page URL, or None
+    timestamp: float
+
+
+@dataclass(slots=True)
+class NetworkRequestEntry:
+    """A captured network request, annotated in place once its response arrives."""
+
+    url: str
+    method: str
+    headers: Dict[str, str]
+    post_data: Optional[str]
+    timestamp: float
+    resource_type: str
+    is_navigation: bool
+    id: int
+    response_status: Optional[int] = None
+    response_headers: Optional[Dict[str, str]] = None
+    response_body_size: int = -1
+    response_timestamp: Optional[float] = None
+
+
+@dataclass
+class TaskContext:
+    """State owned by a single run_browser_task invocation.
+
+    Each run captures into its own storages, so concurrent tasks never clear or
+    interleave each other's logs. Event handlers get it bound via partial.
+    """
+
+    tool_call_id: str
+    agent: Optional[Agent] = None
+    console_logs: deque = field(
+        default_factory=lambda: deque(maxlen=MAX_LOG_ENTRIES)
+    )
+    # Requests keyed by id in arrival order: iterates oldest-first like a deque
+    # while letting responses find their request in O(1)
+    network_requests: "OrderedDict[int, NetworkRequestEntry]" = field(
+        default_factory=OrderedDict
+    )
+    # Newest step screenshots only, so long runs can't grow this without bound
+    screenshots: deque = field(
+        default_factory=lambda: deque(maxlen=MAX_SCREENSHOTS)
+    )
+
 
+# Running browser tasks keyed by tool_call_id, in start order
+active_tasks: Dict[str, TaskContext] = {}
 
-# --- Log Storage (Global within this module using deque) ---
-console_log_storage: deque = deque(maxlen=MAX_LOG_ENTRIES)
-network_request_storage: deque = deque(maxlen=MAX_LOG_ENTRIES)
+# The dashboard shows a single browser view and sends its input to a single CDP
+# session, so only one run at a time is interactive: the first to start claims
+# it, and runs started while it is held go without a screencast
+interactive_task: Optional[TaskContext] = None
+
+
+def get_active_agent() -> Optional[Agent]:
+    """Return the interactive task's agent, else the most recently started one."""
+    if interactive_task is not None and interactive_task.agent is not None:
+        return interactive_task.agent
+    for task in reversed(list(active_tasks.values())):
+        if task.agent is not None:
+            return task.agent
+    return None
+
+
+# --- Log Storage ---
+# Request ids come from a counter rather than id(), which CPython can hand to a
+# new object once the old Request is collected; the weak map lets responses
+# recover the id without keeping Request objects alive
+_request_ids = itertools.count()
+_request_id_by_request: "weakref.WeakKeyDictionary[Any, int]" = (
+    weakref.WeakKeyDictionary()
+)
 
-# --- Screenshot Storage (Global within this module) ---
-screenshot_storage: List[Dict[str, Any]] = []
 
+def _store_network_request(task: TaskContext, entry: NetworkRequestEntry) -> None:
+    """Add a request to the task's bounded storage, evicting the oldest when full."""
+    task.network_requests[entry.id] = entry
+    if len(task.network_requests) > MAX_LOG_ENTRIES:
+        task.network_requests.popitem(last=False)
 
-# --- Log Handlers (Use deque's append and send_log with type) ---
-# Async handler functions
-async def _handle_console_message(message):
+
+# --- Dashboard Log Batching ---
+# Event handlers queue their dashboard lines here instead of emitting a socket
+# event each; everything queued during one event loop iteration goes out as a
+# single batch from a callback scheduled on the first queued line. The queue is
+# bounded: if a burst outruns the flush, the oldest lines are dropped rather
+# than letting the backlog (and the emit it feeds) grow without limit.
+MAX_PENDING_LOGS = 8192
+_pending_logs: deque = deque(maxlen=MAX_PENDING_LOGS)
+
+
+def _flush_pending_logs() -> None:
+    batch = list(_pending_logs)
+    _pending_logs.clear()
+    send_log_batch(batch)
+
+
+def _queue_log(
+    message: str, emoji: str = "➡️", log_type: str = "agent", *, args: tuple = ()
+) -> None:
+    # With no dashboard open (or the category muted) there is nothing to
+    # batch; the handlers still record their entries, since the final report
+    # is built from them
+    if log_type not in ENABLED_LOG_TYPES or not has_subscribers():
+        return
+    if not _pending_logs:
+        try:
+            asyncio.get_running_loop().call_soon(_flush_pending_logs)
+        except RuntimeError:
+            # Not on an event loop, so there is no tick to batch within
+            send_log(message, emoji, log_type=log_type, args=args)
+            return
+    _pending_logs.append((message, emoji, log_type, args))
+
+
+# --- Log Handlers (Use deque's append and _queue_log with type) ---
+def handle_console_message(task: TaskContext, message):
     try:
+        # Read each Playwright property once; it is used for both entry and log
         text = message.text
-        log_entry = {
-            "type": message.type,
-            "text": text,
-            "location": message.location,
-            "timestamp": asyncio.get_event_loop().time(),
-        }
-        console_log_storage.append(log_entry)
+        msg_type = message.type
+        task.console_logs.append(
+            ConsoleEntry(
+                type=msg_type,
+                text=text,
+                location=message.location,
+                timestamp=_now(),
+            )
+        )
 
         # Check if message has a failure attribute
-        if hasattr(message, "failure") and message.failure:
-            send_log(
-                f"CONSOLE ERROR [{log_entry['type']}]: {log_entry['text']} - {message.failure}",
+        failure = getattr(message, "failure", None)
+        if failure:
+            _queue_log(
+                "CONSOLE ERROR [%s]: %s - %s",
                 "❌",
                 log_type="console",
+                args=(msg_type, text, failure),
             )
         else:
-            send_log(
-                f"CONSOLE [{log_entry['type']}]: {log_entry['text']}",
-                "🖥️",
-                log_type="console",
+            _queue_log(
+                "CONSOLE [%s]: %s", "🖥️", log_type="console", args=(msg_type, text)
             )
     except Exception as e:
-        send_log(f"Error handling console message: {e}", "❌", log_type="status")
+        _queue_log(f"Error handling console message: {e}", "❌", log_type="status")
 
 
-async def _handle_request(request):
+def _capture_post_data(request, headers: Dict[str, str]) -> Optional[str]:
+    """Return the loggable form of a request body, without awaiting Playwright."""
     try:
-        if not should_log_network_request(request):
-            return
-
-        try:
-            headers = await request.all_headers()
-        except PlaywrightError as e:
-            headers = {"error": f"Req Header Error: {e}"}
-        except Exception as e:
-            headers = {"error": f"Unexpected Req Header Error: {e}"}
-
-        post_data = None
-        try:
-            if request.post_data:
-                post_data_buffer = await request.post_data_buffer()
-                if post_data_buffer:
-                    try:
-                        post_data = post_data_buffer.decode("utf-8", errors="replace")
-                    except Exception:
-                        post_data = repr(post_data_buffer)
-                else:
-                    post_data = ""
-            else:
-                post_data = None
-        except PlaywrightError as e:
-            post_data = f"Post Data Error: {e}"
-        except Exception as e:
-            post_data = f"Unexpected Post Data Error: {e}"
-
-        request_entry = {
-            "url": request.url,
-            "method": request.method,
-            "headers": headers,
-            "postData": post_data,
-            "timestamp": asyncio.get_event_loop().time(),
-            "resourceType": request.resource_type,
-            "is_navigation": request.is_navigation_request(),
-            "id": id(request),
-        }
-        network_request_storage.append(request_entry)
-        send_log(
-            f"NET REQ [{request_entry['method']}]: {request_entry['url']}",
-            "➡️",
-            log_type="network",
-        )
+        # post_data_buffer is a plain property holding the raw body bytes
+        post_data_buffer = request.post_data_buffer
+        if post_data_buffer is None:
+            return None
+        if not post_data_buffer:
+            return ""
+        content_type = headers.get("content-type", "").lower()
+        if not content_type.startswith(TEXT_POST_CONTENT_TYPES):
+            return f"<{len(post_data_buffer)} bytes binary>"
+        # Only decode the part we keep, never the whole upload
+        post_data = post_data_buffer[:MAX_POST_LOG].decode("utf-8", errors="replace")
+        if len(post_data_buffer) > MAX_POST_LOG:
+            post_data += "...[truncated]"
+        return post_data
+    except PlaywrightError as e:
+        return f"Post Data Error: {e}"
     except Exception as e:
-        url = request.url if request else "Unknown URL"
-        send_log(
-            f"Error handling request event for {url}: {e}", "❌", log_type="status"
-        )
+        return f"Unexpected Post Data Error: {e}"
 
 
-async def _handle_response(response):
-    req_id = id(response.request)
+def _record_response(
+    task: TaskContext, req_id: int, response, headers: Dict[str, str], body_size: int
+) -> None:
+    """Annotate the matching request entry with its response."""
     url = response.url
+    status = response.status
+    req = task.network_requests.get(req_id)
+    if req is not None and req.response_timestamp is None:
+        req.response_status = status
+        req.response_headers = headers
+        req.response_body_size = body_size
+        req.response_timestamp = _now()
+        _queue_log(
+            "NET RESP [%s]: %s (JSON)", "⬅️", log_type="network", args=(status, url)
+        )
+    else:
+        _queue_log(
+            "NET RESP* [%s]: %s (JSON, req not matched/updated)",
+            "⬅️",
+            log_type="network",
+            args=(status, url),
+        )
 
-    if not should_log_network_request(response.request):
-        return
 
+async def _measure_response_body(
+    task: TaskContext, response, req_id: int, headers: Dict[str, str]
+):
+    """Record a response without content-length, sized by downloading its body."""
+    body_size = -1
     try:
-        try:
-            headers = await response.all_headers()
-            # Check if content type is JSON
-            content_type = headers.get("content-type", "").lower()
-            if not ("application/json" in content_type or "+json" in content_type):
-                return  # Skip non-JSON responses
-        except PlaywrightError as e:
-            headers = {"error": f"Resp Header Error: {e}"}
-        except Exception as e:
-            headers = {"error": f"Unexpected Resp Header Error: {e}"}
-
-        status = response.status
-
-        body_size = -1
-        try:
-            body_buffer = await response.body()
-            body_size = len(body_buffer) if body_buffer else 0
-        except Exception:
-            pass
-
-        for req in network_request_storage:
-            if req.get("id") == req_id and "response_status" not in req:
-                req["response_status"] = status
-                req["response_headers"] = headers
-                req["response_body_size"] = body_size
-                req["response_timestamp"] = asyncio.get_event_loop().time()
-                send_log(f"NET RESP [{status}]: {url} (JSON)", "⬅️", log_type="network")
-                break
-        else:
-            send_log(
-                f"NET RESP* [{status}]: {url} (JSON, req not matched/updated)",
-                "⬅️",
-                log_type="network",
-            )
+        body_buffer = await response.body()
+        body_size = len(body_buffer) if body_buffer else 0
+    except Exception:
+        pass
+    try:
+        _record_response(task, req_id, response, headers, body_size)
     except Exception as e:
-        send_log(
-            f"Error handling response event for {url}: {e}", "❌", log_type="status"
+        _queue_log(
+            f"Error handling response event for {response.url}: {e}",
+            "❌",
+            log_type="status",
         )
 
 
-async def _handle_page_error(error):
+def handle_page_error(task: TaskContext, error):
     try:
         error_text = f"PAGE ERROR: {error}"
-        send_log(error_text, "🐛", log_type="console")
-        # Add to console_log_storage with type 'error'
-        console_log_storage.append(
-            {
-                "type": "error",
-                "text": error_text,
-                "location": None,
-                "timestamp": asyncio.get_event_loop().time(),
-            }
+        _queue_log(error_text, "🐛", log_type="console")
+        # Add to the task's console logs with type 'error'
+        task.console_logs.append(
+            ConsoleEntry(
+                type="error",
+                text=error_text,
+                location=None,
+                timestamp=_now(),
+            )
         )
     except Exception as e:
-        send_log(f"Error handling page error: {e}", "❌", log_type="status")
+        _queue_log(f"Error handling page error: {e}", "❌", log_type="status")
 
 
-async def _handle_web_error(error):
+def handle_web_error(task: TaskContext, error):
     try:
         error_text = f"JS ERROR: {error.error}: {error.page}"
-        send_log(error_text, "🐛", log_type="console")
-        # Add to console_log_storage with type 'error'
-        console_log_storage.append(
-            {
-                "type": "error",
-                "text": error_text,
-                "location": error.page.url if hasattr(error.page, "url") else None,
-                "timestamp": asyncio.get_event_loop().time(),
-            }
+        _queue_log(error_text, "🐛", log_type="console")
+        # Add to the task's console logs with type 'error'
+        task.console_logs.append(
+            ConsoleEntry(
+                type="error",
+                text=error_text,
+                location=error.page.url if hasattr(error.page, "url") else None,
+                timestamp=_now(),
+            )
         )
     except Exception as e:
-        send_log(f"Error handling web error: {e}", "❌", log_type="status")
+        _queue_log(f"Error handling web error: {e}", "❌", log_type="status")
 
 
-async def _handle_request_failed(error):
+def handle_request_failed(task: TaskContext, error):
     try:
         error_text = f"REQUEST FAILED: {error}"
-        send_log(error_text, "🐛", log_type="console")
-        # Add to console_log_storage with type 'error'
-        console_log_storage.append(
-            {
-                "type": "error",
-                "text": error_text,
-                "location": None,
-                "timestamp": asyncio.get_event_loop().time(),
-            }
+        _queue_log(error_text, "🐛", log_type="console")
+        # Add to the task's console logs with type 'error'
+        task.console_logs.append(
+            ConsoleEntry(
+                type="error",
+                text=error_text,
+                location=None,
+                timestamp=_now(),
+            )
         )
     except Exception as e:
-        send_log(f"Error handling request failed: {e}", "❌", log_type="status")
-
+        _queue_log(f"Error handling request failed: {e}", "❌", log_type="status")
 
-# Non-async wrapper functions for event listeners
-def handle_console_message(message):
-    asyncio.create_task(_handle_console_message(message))
 
+# Entry points for network events. Like the console and error handlers above
+# they run synchronously; a task is only scheduled to download a response body.
+async def _run_network_handler(handler, *args):
+    async with network_handler_semaphore:
+        await handler(*args)
 
-def handle_request(request):
-    asyncio.create_task(_handle_request(request))
 
+# Filtered requests (images, fonts, stylesheets, ...) are dropped here, before
+# a task is scheduled or any CDP round-trip is made for them
+def handle_request(task: TaskContext, request):
+    if not should_log_network_request(request):
+        return
+    try:
+        # request.headers is a plain property, so no CDP round-trip is needed
+        headers = request.headers
+        req_id = next(_request_ids)
+        _request_id_by_request[request] = req_id
+        request_entry = NetworkRequestEntry(
+            url=request.url,
+            method=request.method,
+            headers=headers,
+            post_data=(
+                _capture_post_data(request, headers) if CAPTURE_POST_DATA else None
+            ),
+            timestamp=_now(),
+            resource_type=request.resource_type,
+            is_navigation=request.is_navigation_request(),
+            id=req_id,
+        )
+        _store_network_request(task, request_entry)
+        _queue_log(
+            "NET REQ [%s]: %s",
+            "➡️",
+            log_type="network",
+            args=(request_entry.method, request_entry.url),
+        )
+    except Exception as e:
+        url = request.url if request else "Unknown URL"
+        _queue_log(
+            f"Error handling request event for {url}: {e}", "❌", log_type="status"
+        )
 
-def handle_response(response):
-    asyncio.create_task(_handle_response(response))
 
+def handle_response(task: TaskContext, response):
+    # Only requests that passed should_log_network_request were given an id,
+    # so the lookup doubles as the filter
+    req_id = _request_id_by_request.get(response.request)
+    if req_id not in task.network_requests:
+        # Filtered, or the request entry was already evicted: nothing to update
+        return
+    try:
+        # response.headers is a plain property, so no CDP round-trip is needed
+        headers = response.headers
+        # Check if content type is JSON
+        content_type = headers.get("content-type", "").lower()
+        if not ("application/json" in content_type or "+json" in content_type):
+            return  # Skip non-JSON responses
 
-def handle_page_error(error):
-    asyncio.create_task(_handle_page_error(error))
+        try:
+            body_size = int(headers.get("content-length", -1))
+        except (TypeError, ValueError):
+            body_size = -1
+        if body_size < 0 and CAPTURE_RESPONSE_BODY_SIZE:
+            measure_task = asyncio.create_task(
+                _run_network_handler(
+                    _measure_response_body, task, response, req_id, headers
+                )
+            )
+            _pending_tasks.add(measure_task)
+            measure_task.add_done_callback(_pending_tasks.discard)
+            return
 
+        _record_response(task, req_id, response, headers, body_size)
+    except Exception as e:
+        _queue_log(
+            f"Error handling response event for {response.url}: {e}",
+            "❌",
+            log_type="status",
+        )
 
-def handle_web_error(error):
-    asyncio.create_task(_handle_web_error(error))
 
 
-def handle_request_failed(error):
-    asyncio.create_task(_handle_request_failed(error))
 
 
 # Read the JavaScript overlay code from the file
@@ -336,145 +550,102 @@ except Exception as e:
         "console.error('Failed to load agent overlay script');"  # Fallback
     )
 
-
-# Function to inject the agent control overlay into a page
-async def inject_agent_control_overlay(page: PlaywrightPage):
-    """Inject the agent control overlay into a page."""
-    e1 = None
-    e2 = None
+# Init scripts run before the document is parsed, when there is no body to
+# attach the overlay to yet, so hold it back until the DOM is ready. They also
+# run in every frame, but the controls belong on the top-level page only, and
+# the overlay's own logging is shadowed so it never lands in the page's report
+_OVERLAY_INIT_SCRIPT = f"""(() => {{
+    if (window !== window.top) return;
+    const run = () => {{
+        const console = {{ log() {{}}, warn() {{}}, error() {{}} }};
+{AGENT_CONTROL_OVERLAY_JS}
+    }};
+    if (document.readyState === 'loading') {{
+        document.addEventListener('DOMContentLoaded', run, {{ once: true }});
+    }} else {{
+        run();
+    }}
+}})();"""
+
+
+# Function to set up agent control functions for a browser context
+async def setup_context_agent_controls(
+    context: PlaywrightBrowserContext, task: TaskContext
+):
+    """Set up agent controls once for every page of a context owned by the given task."""
+    # Let Playwright inject the overlay into every new document
     try:
-        # First try with evaluate
-        try:
-            await page.evaluate(AGENT_CONTROL_OVERLAY_JS)
-            return True
-        except Exception as exc1:
-            e1 = exc1
-            send_log(
-                f"Failed to inject with page.evaluate(): {e1}", "⚠️", log_type="status"
-            )
-        # Try with add_script_tag as fallback
-        try:
-            await page.add_script_tag(content=AGENT_CONTROL_OVERLAY_JS)
-            return True
-        except Exception as exc2:
-            e2 = exc2
-            send_log(
-                f"Failed to inject with page.add_script_tag(): {e2}",
-                "⚠️",
-                log_type="status",
-            )
-        # Try with evaluate_handle as last resort
-        try:
-            await page.evaluate_handle(f"() => {{ {AGENT_CONTROL_OVERLAY_JS} }}")
-            return True
-        except Exception as e3:
-            send_log(
-                f"Failed to inject with page.evaluate_handle(): {e3}",
-                "⚠️",
-                log_type="status",
-            )
-            raise Exception(f"All injection methods failed: {e1}, {e2}, {e3}")
+        await context.add_init_script(script=_OVERLAY_INIT_SCRIPT)
     except Exception as e:
         send_log(
-            f"Failed to inject agent control overlay: {e}", "❌", log_type="status"
+            f"Failed to register agent control overlay: {e}", "❌", log_type="status"
         )
-        raise
-
-
-# Function to set up agent control functions for a page
-async def setup_page_agent_controls(page: PlaywrightPage):
-    """Set up agent control functions for a page."""
-    global agent_instance
 
+    # Expose all agent control functions through a single binding; a
+    # context-level binding covers existing and future pages alike
     try:
-        # Expose agent control functions to the page
-        await page.expose_function("pauseAgent", lambda: pause_agent())
-        await page.expose_function("resumeAgent", lambda: resume_agent())
-        await page.expose_function("stopAgent", lambda: stop_agent())
-        await page.expose_function("getAgentState", lambda: get_agent_state())
-
-        # Add navigation listener to re-inject overlay after navigation
-        async def handle_frame_navigation(frame):
-            if frame is page.main_frame:
-                send_log(f"Page navigated to: {page.url}", "🧭", log_type="status")
-
-        # Define async wrapper functions for event listeners
-        page.on(
-            "framenavigated",
-            lambda frame: asyncio.create_task(handle_frame_navigation(frame)),
-        )
-        send_log("Added navigation listener to page", "🔄", log_type="status")
-
-        # Also listen for load events to re-inject the overlay
-        async def handle_load():
-            send_log(f"Page load event on: {page.url}", "🔄", log_type="status")
-            await asyncio.sleep(0.5)  # Wait a bit for the page to stabilize
-
-        page.on("load", lambda: asyncio.create_task(handle_load()))
-        send_log("Added load event listener to page", "🔄", log_type="status")
-
+        await context.expose_function("__agentRpc", partial(_dispatch_agent_rpc, task))
     except Exception as e:
         send_log(f"Failed to set up agent controls: {e}", "❌", log_type="status")
 
 
 # Agent control functions
-def pause_agent():
+def _resolve_agent(task: Optional[TaskContext]) -> Optional[Agent]:
+    """Return the task's agent, or the most recent active agent when no task is given."""
+    if task is not None:
+        return task.agent
+    return get_active_agent()
+
+
+def pause_agent(task: Optional[TaskContext] = None):
     """Pause the agent."""
-    global agent_instance
-    if agent_instance:
-        agent_instance.pause()
+    agent = _resolve_agent(task)
+    if agent:
+        agent.pause()
         send_log("Agent paused", "⏸️", log_type="status")
         # Send agent state update to frontend
-        from .log_server import socketio
-
         socketio.emit("agent_state", {"state": {"paused": True, "stopped": False}})
         return True
     return False
 
 
-def resume_agent():
+def resume_agent(task: Optional[TaskContext] = None):
     """Resume the agent."""
-    global agent_instance
-    if agent_instance:
-        agent_instance.resume()
+    agent = _resolve_agent(task)
+    if agent:
+        agent.resume()
         send_log("Agent resumed", "▶️", log_type="status")
         # Send agent state update to frontend
-        from .log_server import socketio
-
         socketio.emit("agent_state", {"state": {"paused": False, "stopped": False}})
         return True
     return False
 
 
-def stop_agent():
+def stop_agent(task: Optional[TaskContext] = None):
     """Stop the agent."""
-    global agent_instance
-    if agent_instance:
-        agent_instance.stop()
+    agent = _resolve_agent(task)
+    if agent:
+        agent.stop()
         send_log("Agent stopped", "⏹️", log_type="status")
         # Send agent state update to frontend
-        from .log_server import socketio
-
         socketio.emit("agent_state", {"state": {"paused": False, "stopped": True}})
         return True
     return False
 
 
-def get_agent_state():
+def get_agent_state(task: Optional[TaskContext] = None):
     """Get the agent state."""
-    global agent_instance
+    agent = _resolve_agent(task)
     state = {"paused": False, "stopped": False}
 
-    if agent_instance and hasattr(agent_instance, "state"):
+    if agent and hasattr(agent, "state"):
         state = {
-            "paused": agent_instance.state.paused,
-            "stopped": agent_instance.state.stopped,
+            "paused": agent.state.paused,
+            "stopped": agent.state.stopped,
         }
 
     # Send agent state update to frontend
     try:
-        from .log_server import socketio
-
         socketio.emit("agent_state", {"state": state})
     except Exception:
         pass
@@ -482,10 +653,26 @@ def get_agent_state():
     return state
 
 
+# Agent control functions reachable from the overlay via window.__agentRpc(name)
+AGENT_RPC_METHODS = {
+    "pauseAgent": pause_agent,
+    "resumeAgent": resume_agent,
+    "stopAgent": stop_agent,
+    "getAgentState": get_agent_state,
+}
+
+
+def _dispatch_agent_rpc(task: TaskContext, method: str, *args):
+    """Dispatch an overlay call to the matching control function for the task."""
+    handler = AGENT_RPC_METHODS.get(method)
+    if handler is None:
+        raise ValueError(f"Unknown agent control method: {method}")
+    return handler(task, *args)
+
+
 # Function to get the browser task loop
 def get_browser_task_loop():
     """Get the asyncio loop used by run_browser_task."""
-    global browser_task_loop
     return browser_task_loop
 
 
@@ -502,7 +689,7 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
     """
     global active_cdp_session, active_screencast_running
 
-    if event_type != "scroll":
+    if DEBUG_LOGS and event_type != "scroll":
         send_log(
             f"handle_browser_input called with event_type: {event_type}",
             "🔍",
@@ -519,7 +706,7 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
         send_log("Input error: Screencast not running", "❌", log_type="status")
         return
 
-    if event_type != "scroll":
+    if DEBUG_LOGS and event_type != "scroll":
         send_log(f"Processing input: {event_type}", "🔄", log_type="status")
 
     try:
@@ -547,9 +734,10 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
                 await active_cdp_session.send(
                     "Input.dispatchMouseEvent", mouse_pressed_params
                 )
-                send_log(
-                    "mousePressed dispatched successfully", "✅", log_type="status"
-                )
+                if DEBUG_LOGS:
+                    send_log(
+                        "mousePressed dispatched successfully", "✅", log_type="status"
+                    )
             except Exception as press_error:
                 send_log(
                     f"Input error: Failed to send mousePressed: {press_error}",
@@ -558,9 +746,6 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
                 )
                 return
 
-            # Short delay often helps reliability
-            await asyncio.sleep(0.05)
-
             # Mouse Released
             mouse_released_params = {
                 "type": "mouseReleased",
@@ -576,9 +761,10 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
                 await active_cdp_session.send(
                     "Input.dispatchMouseEvent", mouse_released_params
                 )
-                send_log(
-                    "mouseReleased dispatched successfully", "✅", log_type="status"
-                )
+                if DEBUG_LOGS:
+                    send_log(
+                        "mouseReleased dispatched successfully", "✅", log_type="status"
+                    )
             except Exception as release_error:
                 send_log(
                     f"Input error: Failed to send mouseReleased: {release_error}",
@@ -587,7 +773,8 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
                 )
                 return
 
-            send_log(f"Click sent at ({x},{y})", "👆", log_type="status")
+            if DEBUG_LOGS:
+                send_log(f"Click sent at ({x},{y})", "👆", log_type="status")
 
         elif event_type == "keydown":
             # Map frontend details to CDP key event parameters
@@ -613,11 +800,12 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
 
             # For Backspace, also send the 'deleteBackward' editing command
             if key == "Backspace":
-                send_log(
-                    "Adding 'deleteBackward' command for Backspace keydown",
-                    "🔧",
-                    log_type="status",
-                )
+                if DEBUG_LOGS:
+                    send_log(
+                        "Adding 'deleteBackward' command for Backspace keydown",
+                        "🔧",
+                        log_type="status",
+                    )
                 key_params["commands"] = ["deleteBackward"]
 
             try:
@@ -630,7 +818,8 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
                 )
                 return
 
-            send_log(f"Key down sent: {key}", "⌨️", log_type="status")
+            if DEBUG_LOGS:
+                send_log(f"Key down sent: {key}", "⌨️", log_type="status")
 
         elif event_type == "keyup":
             key = details.get("key", "")
@@ -654,7 +843,8 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
                 )
                 return
 
-            send_log(f"Key up sent: {key}", "⌨️", log_type="status")
+            if DEBUG_LOGS:
+                send_log(f"Key up sent: {key}", "⌨️", log_type="status")
 
         elif event_type == "scroll":
             # Use dispatchMouseEvent with type 'mouseWheel'
@@ -710,16 +900,13 @@ async def handle_browser_input(event_type: str, details: Dict) -> None:
 
 def _map_modifiers(details: Dict) -> int:
     """Maps modifier keys from frontend details to CDP modifier bitmask."""
-    modifiers = 0
-    if details.get("altKey"):
-        modifiers |= 1
-    if details.get("ctrlKey"):
-        modifiers |= 2
-    if details.get("metaKey"):
-        modifiers |= 4  # Command key on Mac
-    if details.get("shiftKey"):
-        modifiers |= 8
-    return modifiers
+    # alt=1, ctrl=2, meta=4 (Command key on Mac), shift=8
+    return (
+        bool(details.get("altKey"))
+        | bool(details.get("ctrlKey")) << 1
+        | bool(details.get("metaKey")) << 2
+        | bool(details.get("shiftKey")) << 3
+    )
 
 
 def set_screencast_running(running: bool = True) -> None:
@@ -735,6 +922,89 @@ def set_screencast_running(running: bool = True) -> None:
     active_screencast_running = running
 
 
+# --- Shared Browser Pool ---
+# One Playwright driver, and one Chromium per headless mode, are launched on
+# first use and kept for the life of the server. Each task only opens (and
+# closes) its own contexts, so Chromium's multi-second cold start is paid once.
+_pool_playwright = None
+_pooled_browsers: Dict[bool, Any] = {}
+
+# Chromium flags switching off background services (extensions, translate,
+# background networking/throttling) the agent never needs, to cut launch time
+# and per-tab memory. No remote debugging port: browser-use is handed the
+# Playwright browser directly, and a fixed port would clash between the
+# headless and headed pooled browsers
+CHROMIUM_ARGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-features=TranslateUI",
+    "--disable-dev-shm-usage",
+    "--disable-default-apps",
+    "--no-first-run",
+    "--mute-audio",
+]
+# Headless runs have no window to composite, so skip GPU process startup too
+HEADLESS_CHROMIUM_ARGS = CHROMIUM_ARGS + ["--disable-gpu"]
+_browser_pool_lock = asyncio.Lock()
+
+
+async def _get_browser(headless: bool):
+    """Return the shared (playwright, browser) pair, launching on first use.
+
+    Args:
+        headless: Whether the browser should run headless.
+
+    Returns:
+        tuple: The Playwright driver and the pooled Chromium browser.
+    """
+    global _pool_playwright
+    async with _browser_pool_lock:
+        browser = _pooled_browsers.get(headless)
+        if browser is not None and browser.is_connected():
+            return _pool_playwright, browser
+
+        if _pool_playwright is None:
+            _pool_playwright = await async_playwright().start()
+        browser = await _pool_playwright.chromium.launch(
+            headless=headless,
+            args=HEADLESS_CHROMIUM_ARGS if headless else CHROMIUM_ARGS,
+        )
+        _pooled_browsers[headless] = browser
+        send_log(
+            f"Launched pooled browser (headless={headless}).",
+            "🎭",
+            log_type="status",
+        )
+        return _pool_playwright, browser
+
+
+async def shutdown_browser_pool() -> None:
+    """Close the pooled browsers and stop the shared Playwright driver."""
+    global _pool_playwright
+    async with _browser_pool_lock:
+        for browser in _pooled_browsers.values():
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        _pooled_browsers.clear()
+        if _pool_playwright is not None:
+            try:
+                await _pool_playwright.stop()
+            except Exception:
+                pass
+            _pool_playwright = None
+
+
+# Shared LLM client: built once per model so every task reuses the same HTTP
+# connection pool instead of paying a fresh TCP+TLS handshake per run
+@lru_cache(maxsize=4)
+def _get_llm(model: str) -> ChatAnthropic:
+    return ChatAnthropic(model=model)
+
+
 # Helper function to get persisted browser state
 def _get_persisted_state() -> Optional[str]:
     """
@@ -747,78 +1017,114 @@ def _get_persisted_state() -> Optional[str]:
     return state_file if os.path.exists(state_file) else None
 
 
+# --- browser-use Context with Monitoring ---
+class MonitoredBrowserContext(BrowserContext):
+    """browser-use context backed by a Playwright context the run created.
+
+    browser-use would otherwise pick its own Playwright context; with the
+    pooled browser that means every concurrent run landing in the same one.
+    Each run_browser_task hands over the context it opened for itself, and
+    log capture and agent controls are wired into it here.
+    """
+
+    def __init__(
+        self,
+        browser: Browser,
+        task: TaskContext,
+        playwright_context: PlaywrightBrowserContext,
+        config: Optional[BrowserContextConfig] = None,
+    ):
+        super().__init__(browser=browser, config=config or BrowserContextConfig())
+        self.task = task
+        self.playwright_context = playwright_context
+
+    async def _create_context(self, browser_pw):
+        # The run's own context, already created with any persisted storage state
+        raw_playwright_context = self.playwright_context
+
+        # Use the non-async wrapper functions for event listeners
+        raw_playwright_context.on("console", partial(handle_console_message, self.task))
+        raw_playwright_context.on("request", partial(handle_request, self.task))
+        raw_playwright_context.on("requestfailed", partial(handle_request_failed, self.task))
+        raw_playwright_context.on("response", partial(handle_response, self.task))
+        raw_playwright_context.on("weberror", partial(handle_web_error, self.task))
+        raw_playwright_context.on("pageerror", partial(handle_page_error, self.task))
+
+        await setup_context_agent_controls(raw_playwright_context, self.task)
+
+        if DEBUG_LOGS:
+            send_log(
+                "Log listeners and agent controls attached.",
+                "👂",
+                log_type="status",
+            )  # Type: status
+
+        return raw_playwright_context
+
+
 async def run_browser_task(
     task: str, tool_call_id: str = None, headless: bool = True
 ) -> Dict[str, Any]:
-    global browser_task_loop, screenshot_task
-    # Store the current asyncio loop for input handling
-    browser_task_loop = asyncio.get_running_loop()
     """
     Run a task using browser-use agent, sending logs to the dashboard.
 
+    At most MAX_CONCURRENT_TASKS runs are active at once; the rest wait.
+
     Args:
         task: The task to run.
         tool_call_id: The tool call ID for API headers.
 
     Returns:
-        str: Agent's final result (stringified).
+        dict: The agent's final result (stringified) under "result", plus the
+            "screenshots", "console_logs" and "network_requests" captured
+            during the run.
     """
-    global \
-        agent_instance, \
-        console_log_storage, \
-        network_request_storage, \
-        screenshot_storage, \
-        original_create_context, \
-        _original_bring_to_front
-    global active_cdp_session, active_screencast_running
+    async with task_semaphore:
+        return await _run_browser_task(task, tool_call_id, headless)
 
-    # Clear screenshot storage for this run
-    screenshot_storage.clear()
-    import traceback  # Make sure traceback is imported for error logging
 
-    # --- Clear Logs for this Run ---
-    console_log_storage.clear()
-    network_request_storage.clear()
+async def _run_browser_task(
+    task: str, tool_call_id: Optional[str], headless: bool
+) -> Dict[str, Any]:
+    """Body of run_browser_task, run while holding a task_semaphore slot."""
+    global browser_task_loop
+    # Store the current asyncio loop for input handling
+    browser_task_loop = asyncio.get_running_loop()
+    global active_cdp_session, active_screencast_running, interactive_task
 
-    # Local Playwright variables for this run
-    playwright = None
-    playwright_browser = None
-    agent_browser = None  # browser-use Browser instance
-    local_original_create_context = (
-        None  # To store original method for this run's finally block
-    )
+    # --- Ensure Tool Call ID ---
+    if tool_call_id is None:
+        tool_call_id = str(uuid.uuid4())
+        if DEBUG_LOGS:
+            send_log(
+                f"Generated tool_call_id: {tool_call_id}", "🆔", log_type="status"
+            )  # Type: status
 
-    # Configure logging suppression
-    logging.basicConfig(level=logging.CRITICAL)  # Set root logger level first
-    # Then configure specific loggers
-    for logger_name in ["browser_use", "root", "agent", "browser"]:
-        # Get the logger for the current name and set its level
-        current_logger = logging.getLogger(logger_name)
-        current_logger.setLevel(logging.CRITICAL)
+    # Register this run so the dashboard and page controls can reach its agent
+    task_ctx = TaskContext(tool_call_id=tool_call_id)
+    active_tasks[tool_call_id] = task_ctx
 
-    warnings.filterwarnings("ignore", category=UserWarning)
-    set_verbose(False)
+    # Claim the dashboard view and input unless a concurrent run holds them
+    interactive = interactive_task is None
+    if interactive:
+        interactive_task = task_ctx
 
-    try:
-        # Apply the patch to prevent focus stealing
-        global _original_bring_to_front
-        _original_bring_to_front = PlaywrightPage.bring_to_front
-        PlaywrightPage.bring_to_front = _no_bring_to_front
-
-        # --- Initialize Playwright Directly ---
-        playwright = await async_playwright().start()
-        # Launch with CDP enabled
-        playwright_browser = await playwright.chromium.launch(
-            headless=headless,  # Use the provided headless parameter
-            args=["--remote-debugging-port=9222"],
-        )
+    # Local Playwright variables for this run
+    agent_browser = None  # browser-use Browser instance
+    agent_context = None  # browser-use context handed to the agent
+    screencast_context = None  # Playwright context backing the dashboard view
+    screenshot_task = None  # This run's periodic screenshot task
+    frame_forward_task = None  # Forwards coalesced screencast frames
 
-        # Get the CDP URL from the browser
-        send_log(
-            f"Playwright initialized for task with CDP (headless={headless}).",
-            "🎭",
-            log_type="status",
-        )  # Type: status
+    try:
+        # --- Get the pooled Playwright browser ---
+        playwright, playwright_browser = await _get_browser(headless)
+        if DEBUG_LOGS:
+            send_log(
+                f"Playwright browser ready for task (headless={headless}).",
+                "🎭",
+                log_type="status",
+            )  # Type: status
 
         # --- Check for persisted browser state ---
         persisted_state = _get_persisted_state()
@@ -830,66 +1136,64 @@ async def run_browser_task(
             )
 
         # --- Create browser-use Browser ---
-        browser_config = BrowserConfig(
-            disable_security=True, headless=headless, cdp_url="http://127.0.0.1:9222"
-        )
+        browser_config = BrowserConfig(disable_security=True, headless=headless)
         agent_browser = Browser(config=browser_config)
         agent_browser.playwright = playwright
         agent_browser.playwright_browser = playwright_browser
-        send_log(
-            "Linked Playwright to agent browser with CDP enabled.",
-            "🔗",
-            log_type="status",
-        )  # Type: status
+        if DEBUG_LOGS:
+            send_log(
+                "Linked pooled Playwright browser to agent browser.",
+                "🔗",
+                log_type="status",
+            )  # Type: status
 
-        # --- Set up CDP screencasting ---
-        # Detailed logging and error handling for each step
-        try:
-            # Create a context and page as recommended
-            context = await playwright_browser.new_context(
-                storage_state=persisted_state
-            )
-            first_page = await context.new_page()
+        # --- This run's own Playwright context ---
+        # Shared by the dashboard screencast and the agent, and never by
+        # another run, even though they all use the pooled browser
+        screencast_context = await playwright_browser.new_context(
+            storage_state=persisted_state
+        )
+        first_page = await screencast_context.new_page()
 
-            # Create a CDP session for the page
+        # --- Set up CDP screencasting (interactive run only) ---
+        if not interactive:
+            send_log(
+                "Another run owns the dashboard view; running without screencast.",
+                "📺",
+                log_type="status",
+            )
+        else:
+            # Detailed logging and error handling for each step
             try:
-                cdp_session = await context.new_cdp_session(first_page)
-                # Store the CDP session globally for input handling
-                global active_cdp_session
-                active_cdp_session = cdp_session
-            except Exception as cdp_error:
-                send_log(
-                    f"Failed to create CDP session: {cdp_error}",
-                    "❌",
-                    log_type="status",
-                )
-                import traceback
-
-                raise  # Re-raise to be caught by outer try/except
-
-            # Set up a listener for screencast frames
-            async def handle_screencast_frame(params):
-                if "data" not in params:
-                    return
+                # Create a CDP session for the page
+                try:
+                    cdp_session = await screencast_context.new_cdp_session(first_page)
+                    # Store the CDP session globally for input handling
+                    active_cdp_session = cdp_session
+                except Exception as cdp_error:
+                    send_log(
+                        f"Failed to create CDP session: {cdp_error}",
+                        "❌",
+                        log_type="status",
+                    )
+                    raise  # Re-raise to be caught by outer try/except
 
-                if "sessionId" not in params:
-                    return
+                # Frames are coalesced: each one is acked immediately so Chrome
+                # keeps producing them, but only the newest pending frame is
+                # forwarded to the dashboard, one at a time
+                latest_frame = {"data": None}
+                frame_ready = asyncio.Event()
 
-                try:
-                    # Format as data URL
-                    image_data = params["data"]
-                    image_data_url = f"data:image/jpeg;base64,{image_data}"
+                # Set up a listener for screencast frames
+                async def handle_screencast_frame(params):
+                    if "data" not in params:
+                        return
 
-                    # Send to frontend via SocketIO
-                    try:
-                        from .log_server import send_browser_view
-                    except ImportError:
+                    if "sessionId" not in params:
                         return
 
-                    try:
-                        await send_browser_view(image_data_url)
-                    except Exception:
-                        pass
+                    latest_frame["data"] = params["data"]
+                    frame_ready.set()
 
                     # Acknowledge the frame
                     try:
@@ -899,221 +1203,127 @@ async def run_browser_task(
                         )
                     except Exception:
                         pass
-                except Exception:
-                    pass
-
-            # Define async wrapper function for screencast frame event
-            cdp_session.on("Page.screencastFrame", handle_screencast_frame)
-
-            # Start the screencast
-            try:
-                await cdp_session.send(
-                    "Page.startScreencast",
-                    {
-                        "format": "png",
-                        "quality": 100,
-                        "maxWidth": 1920,
-                        "maxHeight": 1080,
-                    },
-                )
-            except Exception as start_error:
-                send_log(
-                    f"Failed to start screencast: {start_error}",
-                    "❌",
-                    log_type="status",
-                )
-                import traceback
-
-                raise  # Re-raise to be caught by outer try/except
-
-            # Test if we can take a screenshot directly
-            try:
-                screenshot_bytes = await first_page.screenshot(type="jpeg")
-
-                # Try sending this screenshot directly
-                import base64
-
-                screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
-                direct_image_url = f"data:image/jpeg;base64,{screenshot_b64}"
-
-                from .log_server import send_browser_view
-
-                await send_browser_view(direct_image_url)
-            except Exception:
-                import traceback
 
-            send_log(
-                "CDP screencast started for browser-use browser.",
-                "📹",
-                log_type="status",
-            )
-
-            # Define the periodic screenshot capture function
-            async def capture_screenshots(page, interval=1 / 30):
-                """Capture screenshots at the specified interval in seconds (30 FPS)."""
-                global active_screencast_running
-                send_log(
-                    "Starting periodic screenshot capture at 30 FPS",
-                    "🎬",
-                    log_type="status",
-                )
-                try:
-                    while active_screencast_running:
+                async def forward_screencast_frames():
+                    while True:
+                        await frame_ready.wait()
+                        frame_ready.clear()
+                        # Format as data URL
+                        image_data_url = f"data:image/jpeg;base64,{latest_frame['data']}"
                         try:
-                            # Take a screenshot
-                            screenshot_bytes = await page.screenshot(
-                                type="jpeg", quality=80
-                            )
-
-                            # Convert to base64
-                            screenshot_b64 = base64.b64encode(screenshot_bytes).decode(
-                                "utf-8"
-                            )
-
-                            # Format as data URL
-                            screenshot_data_url = (
-                                f"data:image/jpeg;base64,{screenshot_b64}"
-                            )
-
-                            # Send to frontend
-                            from .log_server import send_browser_view
-
-                            await send_browser_view(screenshot_data_url)
-
-                        except Exception as e:
-                            if not active_screencast_running:
-                                break
-                            # Don't log every error to avoid spamming
-                            if (
-                                "Target closed" in str(e)
-                                or "Session closed" in str(e)
-                                or "Connection closed" in str(e)
-                            ):
-                                active_screencast_running = False
-                                break
-
-                        # Wait for the next interval
-                        await asyncio.sleep(interval)
-                except asyncio.CancelledError:
-                    send_log(
-                        "Periodic screenshot capture stopped", "🛑", log_type="status"
-                    )
-                except Exception as e:
-                    send_log(f"Screenshot capture error: {e}", "❌", log_type="status")
-
-            # Start the screenshot capture task
-            active_screencast_running = True
-            if headless:
-                screenshot_task = asyncio.create_task(capture_screenshots(first_page))
-
-        except Exception as e:
-            send_log(f"Failed to start CDP screencast: {e}", "❌", log_type="status")
-            import traceback
-
-        # --- Patch BrowserContext._create_context ---
-        # Store original only if not already stored (first run)
-        if original_create_context is None:
-            original_create_context = BrowserContext._create_context
-            local_original_create_context = (
-                original_create_context  # Also store for finally block
-            )
-        else:
-            # Already patched, just ensure we have a reference for finally
-            local_original_create_context = original_create_context
+                            await send_browser_view(image_data_url)
+                        except Exception:
+                            pass
 
-        async def patched_create_context(self, browser_pw):
-            if original_create_context is None:
-                raise RuntimeError("Original _create_context not stored correctly")
+                # Define async wrapper function for screencast frame event
+                cdp_session.on("Page.screencastFrame", handle_screencast_frame)
+                frame_forward_task = asyncio.create_task(forward_screencast_frames())
 
-            # Check for persisted browser state
-            persisted_state = _get_persisted_state()
-            if persisted_state:
-                send_log(
-                    "Loading persisted browser state in new context",
-                    "💾",
-                    log_type="status",
-                )
-
-            # Call the original method but with storage_state if available
-            raw_playwright_context = await original_create_context(self, browser_pw)
-
-            # Apply storage state after context creation if available
-            if persisted_state and raw_playwright_context:
+                # Start the screencast
                 try:
-                    with open(persisted_state, "r") as f:
-                        state_data = json.load(f)
-
-                    # Load cookies and localStorage from state
-                    if "cookies" in state_data:
-                        await raw_playwright_context.add_cookies(state_data["cookies"])
-
-                    # Origins with storage set is already handled by Playwright internally
+                    await cdp_session.send(
+                        "Page.startScreencast",
+                        {
+                            "format": "png",
+                            "quality": 100,
+                            "maxWidth": 1920,
+                            "maxHeight": 1080,
+                        },
+                    )
+                except Exception as start_error:
                     send_log(
-                        "Applied persisted browser state to context",
-                        "💾",
+                        f"Failed to start screencast: {start_error}",
+                        "❌",
                         log_type="status",
                     )
-                except Exception as e:
+                    raise  # Re-raise to be caught by outer try/except
+
+                if DEBUG_LOGS:
                     send_log(
-                        f"Failed to apply persisted state to context: {e}",
-                        "⚠️",
+                        "CDP screencast started for browser-use browser.",
+                        "📹",
                         log_type="status",
                     )
 
-            if raw_playwright_context:
-                # Use the non-async wrapper functions for event listeners
-                raw_playwright_context.on("console", handle_console_message)
-                raw_playwright_context.on("request", handle_request)
-                raw_playwright_context.on("requestfailed", handle_request_failed)
-                raw_playwright_context.on("response", handle_response)
-                raw_playwright_context.on("weberror", handle_web_error)
-                raw_playwright_context.on("pageerror", handle_page_error)
-
-                # Set up agent controls for existing pages
-                for page in raw_playwright_context.pages:
-                    await setup_page_agent_controls(page)
-
-                # Define non-async wrapper function for page event
-                def on_page(page):
-                    asyncio.create_task(setup_page_agent_controls(page))
-
-                # Set up agent controls for new pages using non-async wrapper
-                raw_playwright_context.on("page", on_page)
+                # Define the periodic screenshot capture function
+                async def capture_screenshots(page, interval=1 / 30):
+                    """Capture screenshots at the specified interval in seconds (30 FPS)."""
+                    global active_screencast_running
+                    if DEBUG_LOGS:
+                        send_log(
+                            "Starting periodic screenshot capture at 30 FPS",
+                            "🎬",
+                            log_type="status",
+                        )
+                    try:
+                        while active_screencast_running:
+                            try:
+                                # Take a screenshot
+                                screenshot_bytes = await page.screenshot(
+                                    type="jpeg", quality=80
+                                )
+
+                                # Convert to base64
+                                screenshot_b64 = base64.b64encode(screenshot_bytes).decode(
+                                    "utf-8"
+                                )
+
+                                # Format as data URL
+                                screenshot_data_url = (
+                                    f"data:image/jpeg;base64,{screenshot_b64}"
+                                )
+
+                                # Send to frontend
+                                await send_browser_view(screenshot_data_url)
+
+                            except Exception as e:
+                                if not active_screencast_running:
+                                    break
+                                # Don't log every error to avoid spamming
+                                if (
+                                    "Target closed" in str(e)
+                                    or "Session closed" in str(e)
+                                    or "Connection closed" in str(e)
+                                ):
+                                    active_screencast_running = False
+                                    break
+
+                            # Wait for the next interval
+                            await asyncio.sleep(interval)
+                    except asyncio.CancelledError:
+                        if DEBUG_LOGS:
+                            send_log(
+                                "Periodic screenshot capture stopped", "🛑", log_type="status"
+                            )
+                    except Exception as e:
+                        send_log(f"Screenshot capture error: {e}", "❌", log_type="status")
 
-                send_log(
-                    "Log listeners and agent controls attached.",
-                    "👂",
-                    log_type="status",
-                )  # Type: status
-            else:
-                send_log(
-                    "Original _create_context did not return a context.",
-                    "⚠️",
-                    log_type="status",
-                )  # Type: status
+                # Start the screenshot capture task
+                active_screencast_running = True
+                if headless:
+                    screenshot_task = asyncio.create_task(capture_screenshots(first_page))
 
-            return raw_playwright_context
+            except Exception as e:
+                send_log(f"Failed to start CDP screencast: {e}", "❌", log_type="status")
 
-        BrowserContext._create_context = patched_create_context
+        # --- browser-use context with log listeners and agent controls ---
+        agent_context = MonitoredBrowserContext(
+            browser=agent_browser,
+            task=task_ctx,
+            playwright_context=screencast_context,
+            config=agent_browser.config.new_context_config,
+        )
 
-        # --- Ensure Tool Call ID ---
-        if tool_call_id is None:
-            tool_call_id = str(uuid.uuid4())
+        # --- LLM Setup ---
+        llm = _get_llm("claude-sonnet-4-0")
+        if DEBUG_LOGS:
             send_log(
-                f"Generated tool_call_id: {tool_call_id}", "🆔", log_type="status"
+                f"LLM ({llm.model}) configured.", "🤖", log_type="status"
             )  # Type: status
 
-        # --- LLM Setup ---
-        llm = ChatAnthropic(
-            model="claude-sonnet-4-0",
-        )
-        send_log(
-            f"LLM ({llm.model}) configured.", "🤖", log_type="status"
-        )  # Type: status
-
         # --- Agent Callback ---
         async def state_callback(browser_state, agent_output, step_number):
-            global agent_instance, screenshot_storage  # Ensure we have access to the agent and screenshot storage
+            agent_instance = task_ctx.agent
 
             # Send agent output with type 'agent'
             send_log(f"Step {step_number}", "📍", log_type="agent")
@@ -1137,34 +1347,37 @@ async def run_browser_task(
                         )
 
                         # Log screenshot size for debugging
-                        send_log(
-                            f"Screenshot captured: {len(screenshot_bytes)} bytes, {len(screenshot_base64)} base64 chars",
-                            "📊",
-                            log_type="status",
-                        )
+                        if DEBUG_LOGS:
+                            send_log(
+                                f"Screenshot captured: {len(screenshot_bytes)} bytes, {len(screenshot_base64)} base64 chars",
+                                "📊",
+                                log_type="status",
+                            )
 
                         # Store screenshot with metadata
-                        screenshot_storage.append(
+                        task_ctx.screenshots.append(
                             {
                                 "step": step_number,
                                 "url": browser_state.url,
-                                "timestamp": asyncio.get_event_loop().time(),
+                                "timestamp": _now(),
                                 "screenshot": screenshot_base64,
                             }
                         )
 
-                        send_log(
-                            f"Screenshot stored in storage (total: {len(screenshot_storage)})",
-                            "📸",
-                            log_type="status",
-                        )
+                        if DEBUG_LOGS:
+                            send_log(
+                                f"Screenshot stored in storage (total: {len(task_ctx.screenshots)})",
+                                "📸",
+                                log_type="status",
+                            )
 
                         # Re-inject the overlay
-                        send_log(
-                            f"Re-injecting overlay after step {step_number} into page {current_page.url}",
-                            "🔄",
-                            log_type="status",
-                        )
+                        if DEBUG_LOGS:
+                            send_log(
+                                f"Re-injecting overlay after step {step_number} into page {current_page.url}",
+                                "🔄",
+                                log_type="status",
+                            )
                     else:
                         send_log(
                             f"Could not get current page from agent context for step {step_number}",
@@ -1179,15 +1392,15 @@ async def run_browser_task(
                     )
 
             except Exception as e:
-                # Add traceback for debugging other potential errors
-                import traceback
-
-                tb_str = traceback.format_exc()
-                send_log(
-                    f"Failed to capture screenshot or re-inject overlay after step: {e}\n{tb_str}",
-                    "⚠️",
-                    log_type="status",
-                )
+                # Add traceback for debugging other potential errors; this can
+                # fail on every step, so only format it when someone will see it
+                if has_subscribers():
+                    tb_str = traceback.format_exc()
+                    send_log(
+                        f"Failed to capture screenshot or re-inject overlay after step: {e}\n{tb_str}",
+                        "⚠️",
+                        log_type="status",
+                    )
 
             # Ensure agent_output is a string before logging
             output_str = str(agent_output)
@@ -1198,83 +1411,146 @@ async def run_browser_task(
             task=task,
             llm=llm,
             browser=agent_browser,
+            browser_context=agent_context,
             register_new_step_callback=state_callback,
         )
-        agent_instance = agent
+        task_ctx.agent = agent
 
         send_log(f"Agent starting task: {task}", "🏃", log_type="agent")  # Type: agent
         agent_result = await agent.run()
         send_log("Agent run finished.", "🏁", log_type="agent")  # Type: agent
 
         # --- Prepare Combined Results ---
-        # Convert AgentHistoryList to a serializable format (just stringify)
-        serialized_result = str(agent_result)
+        # Convert AgentHistoryList to a serializable format (just stringify).
+        # Long histories make this expensive, so it runs in a worker thread
+        # rather than stalling other tasks on the loop; the agent is done
+        # with the history by now
+        serialized_result = await asyncio.to_thread(str, agent_result)
 
         # Log information about screenshots before returning
-        send_log(
-            f"Returning {len(screenshot_storage)} screenshots from run_browser_task",
-            "📸",
-            log_type="status",
-        )
-        if screenshot_storage:
-            for i, screenshot in enumerate(screenshot_storage):
-                send_log(
-                    f"Screenshot {i + 1}: Step {screenshot['step']}, {len(screenshot['screenshot'])} base64 chars",
-                    "🔢",
-                    log_type="status",
-                )
+        if DEBUG_LOGS:
+            send_log(
+                f"Returning {len(task_ctx.screenshots)} screenshots from run_browser_task",
+                "📸",
+                log_type="status",
+            )
+        if task_ctx.screenshots:
+            if DEBUG_LOGS:
+                for i, screenshot in enumerate(task_ctx.screenshots):
+                    send_log(
+                        f"Screenshot {i + 1}: Step {screenshot['step']}, {len(screenshot['screenshot'])} base64 chars",
+                        "🔢",
+                        log_type="status",
+                    )
         else:
             send_log(
                 "No screenshots captured during task execution!", "⚠️", log_type="status"
             )
 
-        # Return the agent result and screenshots
-        return {"result": serialized_result, "screenshots": screenshot_storage}
+        # Return the agent result, screenshots and captured logs as plain lists
+        return {
+            "result": serialized_result,
+            "screenshots": list(task_ctx.screenshots),
+            "console_logs": list(task_ctx.console_logs),
+            "network_requests": list(task_ctx.network_requests.values()),
+        }
 
     except Exception as e:
-        error_message = f"Error in run_browser_task: {e}\n{traceback.format_exc()}"
-        send_log(error_message, "❌", log_type="status")  # Type: status
-        return {"result": error_message, "screenshots": screenshot_storage}
+        error_message = f"Error in run_browser_task: {e}"
+        logger.exception("run_browser_task %s failed", tool_call_id)
+        # Only format the dashboard copy when a client is connected to see it
+        if has_subscribers():
+            send_log(
+                f"{error_message}\n{traceback.format_exc()}", "❌", log_type="status"
+            )  # Type: status
+        return {
+            "result": error_message,
+            "screenshots": list(task_ctx.screenshots),
+            "console_logs": list(task_ctx.console_logs),
+            "network_requests": list(task_ctx.network_requests.values()),
+        }
     finally:
         # --- Cleanup ---
-        # Cancel the screenshot task if it's running
+        # The screenshot task and this run's context (the agent does not close
+        # the browser-use wrapper it was handed; closing the wrapper and the
+        # Playwright context twice is harmless) are independent, so wind them
+        # down together. The pooled browser and driver stay up for the next task.
+        pending_cleanup = []
         if screenshot_task:
             screenshot_task.cancel()
+            pending_cleanup.append(screenshot_task)
+        if frame_forward_task:
+            frame_forward_task.cancel()
+            pending_cleanup.append(frame_forward_task)
+        if agent_context:
+            pending_cleanup.append(agent_context.close())
+        if screencast_context:
+            pending_cleanup.append(screencast_context.close())
+        if pending_cleanup:
             try:
-                await screenshot_task
-            except asyncio.CancelledError:
-                pass
+                await asyncio.wait_for(
+                    asyncio.gather(*pending_cleanup, return_exceptions=True),
+                    timeout=CLEANUP_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                send_log(
+                    "Timed out closing the screenshot task and browser contexts.",
+                    "⚠️",
+                    log_type="status",
+                )
+            if DEBUG_LOGS:
+                send_log(
+                    "Screenshot tasks and browser contexts cleaned up.",
+                    "🧹",
+                    log_type="status",
+                )  # Type: status
             screenshot_task = None
-            send_log("Periodic screenshot task canceled", "🧹", log_type="status")
+            frame_forward_task = None
+            agent_context = None
+            screencast_context = None
 
-        # Restore the original bring_to_front method
-        if _original_bring_to_front:
-            PlaywrightPage.bring_to_front = _original_bring_to_front
+        # Not closed: Browser.close() would shut down the pooled browser
+        agent_browser = None
 
-        # Ensure patch is restored
-        if local_original_create_context:
-            BrowserContext._create_context = local_original_create_context
-            send_log(
-                "Original BrowserContext restored.", "🔧", log_type="status"
-            )  # Type: status
+        # Hand the dashboard view and input back for the next run
+        if interactive_task is task_ctx:
+            interactive_task = None
+            active_cdp_session = None
+            active_screencast_running = False
 
-        # Close the browser created specifically for this task
-        if agent_browser:
-            await agent_browser.close()
-            agent_browser = None
-            send_log(
-                "Agent browser resources cleaned up.", "🧹", log_type="status"
-            )  # Type: status
-        # Close the playwright instance started for this task
-        if playwright:
-            await playwright.stop()
-            playwright = None
-            send_log(
-                "Playwright instance for task stopped.", "🧹", log_type="status"
-            )  # Type: status
+        # Unregister this run's agent
+        active_tasks.pop(tool_call_id, None)
+
+        # Clear the browser task loop reference once no run is using it; all
+        # concurrent runs share the same loop
+        if not active_tasks:
+            browser_task_loop = None
+
+
+async def run_many(
+    tasks: List[str], max_parallel: int = 4, headless: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Run several browser tasks concurrently on the pooled browser.
+
+    Each task gets its own tool_call_id, TaskContext and Playwright context,
+    so the runs share only the pooled Chromium. The dashboard view and input
+    follow a single run at a time: the first to start is interactive, and the
+    others run without a screencast.
+
+    Args:
+        tasks: The tasks to run.
+        max_parallel: Maximum number of these tasks running at once (runs
+            are also subject to the global MAX_CONCURRENT_TASKS limit).
+        headless: Whether to run the browser in headless mode.
+
+    Returns:
+        list: The run_browser_task result for each task, in the order given.
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
 
-        # Clear the global instance if it was set
-        agent_instance = None
+    async def run_one(task: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_browser_task(task, headless=headless)
 
-        # Clear the browser task loop reference
-        browser_task_loop = None
+    return await asyncio.gather(*(run_one(task) for task in tasks))
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
 import asyncio
+import json
+import queue
 import threading
+import time
 import webbrowser
 from flask import Flask, render_template, send_from_directory, request
 from flask_socketio import SocketIO
@@ -10,6 +13,11 @@ import os
 from datetime import datetime
 import sys
 
+try:
+    import orjson
+except ImportError:  # Optional speed-up; stdlib json is used without it
+    orjson = None
+
 # Track active dashboard tabs
 active_dashboard_tabs = {}
 last_tab_activity = {}
@@ -32,12 +40,48 @@ templates_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../temp
 app = Flask(__name__, template_folder=templates_dir, static_folder=os.path.join(templates_dir, 'static'))
 app.config['SECRET_KEY'] = 'secret!' # Replace with a proper secret if needed
 
+# --- Socket.IO packet encoding ---
+class _OrjsonCodec:
+    """json-module stand-in backed by orjson for Socket.IO packets.
+
+    python-socketio expects str output and passes stdlib-only keyword
+    arguments (separators), which orjson's compact output already matches.
+    Payloads orjson can't encode (e.g. non-str keys) fall back to stdlib json.
+    """
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            return json.dumps(obj, **kwargs)
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+_socketio_options = {"json": _OrjsonCodec} if orjson is not None else {}
+
 # Initialise SocketIO with chosen async_mode
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode=_async_mode)
+socketio = SocketIO(
+    app, cors_allowed_origins="*", async_mode=_async_mode, **_socketio_options
+)
 
 # Store connected SIDs
 connected_clients = set()
 
+# Verbose diagnostics (per-screenshot sizes and the like) are only sent to the
+# dashboard when WEB_EVAL_DEBUG=1
+DEBUG_LOGS = os.environ.get("WEB_EVAL_DEBUG") == "1"
+
+# Log categories sent to the dashboard; anything else is dropped before it is
+# formatted. WEB_EVAL_LOG_TYPES takes a comma-separated subset, e.g. "agent,status"
+ENABLED_LOG_TYPES = frozenset(
+    t.strip()
+    for t in os.environ.get("WEB_EVAL_LOG_TYPES", "agent,status,console,network").split(",")
+    if t.strip()
+)
+
 @app.route('/')
 def index():
     """Serve the main HTML dashboard page."""
@@ -116,16 +160,84 @@ def set_url_and_task(url: str, task: str):
     current_url = url
     current_task = task
 
-def send_log(message: str, emoji: str = "➡️", log_type: str = 'agent'):
-    """Sends a log message with an emoji prefix and type to all connected clients."""
-    # Ensure socketio context is available. If called from a non-SocketIO thread,
-    # use socketio.emit directly.
-    try:
-        log_entry = f"{emoji} {message}"
-        # Include log_type in the emitted data
-        socketio.emit('log_message', {'data': log_entry, 'type': log_type})
-    except Exception:
-        pass
+def has_subscribers() -> bool:
+    """Return True if at least one dashboard client is connected."""
+    return bool(connected_clients)
+
+# --- Batched Log Emission ---
+# send_log and send_log_batch only enqueue; a background thread coalesces
+# everything queued within LOG_FLUSH_INTERVAL into one 'log_batch' emit, so the
+# Socket.IO write never runs on the browser task's event loop. Entries are
+# queued as raw tuples and only formatted on that thread
+LOG_FLUSH_INTERVAL = 0.1  # seconds
+_log_queue = queue.SimpleQueue()
+_log_emitter_thread = None
+_log_emitter_lock = threading.Lock()
+
+def _format_log_entry(message, emoji, log_type, args=()):
+    """Build the dashboard payload for one queued log, applying %-style args."""
+    if args:
+        try:
+            message = message % args
+        except (TypeError, ValueError):
+            message = f"{message} {args!r}"
+    return {'data': f"{emoji} {message}", 'type': log_type}
+
+def _emit_log_batches():
+    """Drain the log queue forever, emitting one 'log_batch' per interval."""
+    while True:
+        batch = list(_log_queue.get())  # Block until something is logged
+        time.sleep(LOG_FLUSH_INTERVAL)  # Let the rest of the burst arrive
+        try:
+            while True:
+                batch.extend(_log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            socketio.emit('log_batch', [_format_log_entry(*entry) for entry in batch])
+        except Exception:
+            pass
+
+def _ensure_log_emitter():
+    """Start the log emitter thread on first use."""
+    global _log_emitter_thread
+    if _log_emitter_thread is not None:
+        return
+    with _log_emitter_lock:
+        if _log_emitter_thread is None:
+            _log_emitter_thread = threading.Thread(
+                target=_emit_log_batches, name="log-batch-emitter", daemon=True
+            )
+            _log_emitter_thread.start()
+
+def send_log_batch(entries):
+    """Queues several log messages to be sent to all connected clients.
+
+    Args:
+        entries: (message, emoji, log_type, args) tuples, in the order they
+            were logged; args is applied to message %-style, like send_log's
+    """
+    if not entries or not connected_clients:
+        return
+    batch = [entry for entry in entries if entry[2] in ENABLED_LOG_TYPES]
+    if batch:
+        _ensure_log_emitter()
+        _log_queue.put(batch)
+
+def send_log(message: str, emoji: str = "➡️", log_type: str = 'agent', *, args: tuple = ()):
+    """Sends a log message with an emoji prefix and type to all connected clients.
+
+    The message is queued for the log emitter thread, so callers never wait on
+    the Socket.IO write and single lines stay in order with batched ones. When
+    args is given, message is a %-style template that is only filled in on
+    the emitter thread, so hot call sites don't format lines nobody receives.
+    """
+    # Nobody is listening (or the category is muted), so skip formatting and
+    # the emit entirely
+    if log_type not in ENABLED_LOG_TYPES or not connected_clients:
+        return
+    _ensure_log_emitter()
+    _log_queue.put([(message, emoji, log_type, args)])
 
 # --- Browser View Update Function ---
 async def send_browser_view(image_data_url: str):
@@ -162,14 +274,15 @@ def handle_agent_control(data):
     # Log to the dashboard
     send_log(f"Agent control: {action}", "🤖", log_type='status')
     
-    # Import browser_utils to access the agent_instance
+    # Import browser_utils to access the currently running agent
     try:
-        from .browser_utils import agent_instance
+        from .browser_utils import get_active_agent
     except ImportError:
-        error_msg = "Could not import agent_instance from browser_utils"
+        error_msg = "Could not import get_active_agent from browser_utils"
         send_log(f"Agent control error: {error_msg}", "❌", log_type='status')
         return
     
+    agent_instance = get_active_agent()
     if not agent_instance:
         error_msg = "No active agent instance"
         send_log(f"Agent control error: {error_msg}", "❌", log_type='status')
@@ -209,8 +322,8 @@ def handle_browser_input_event(data):
     event_type = data.get('type')
     details = data.get('details')
     
-    # Log to the dashboard as well
-    if event_type != 'scroll':
+    # Per-event chatter is only useful when debugging input forwarding
+    if DEBUG_LOGS and event_type != 'scroll':
         send_log(f"Received browser input: {event_type}", "🖱️", log_type='status')
     
     # Import the handle_browser_input function and other utilities from browser_utils
@@ -243,9 +356,8 @@ def handle_browser_input_event(data):
             handle_browser_input(event_type, details),
             loop
         )
-        if event_type == 'scroll':
-            return 
-        send_log(f"Input {event_type} scheduled for processing", "✅", log_type='status')
+        if DEBUG_LOGS and event_type != 'scroll':
+            send_log(f"Input {event_type} scheduled for processing", "✅", log_type='status')
         
     except RuntimeError as e:
         error_msg = f"No running asyncio event loop found: {e}"
@@ -337,7 +449,6 @@ def open_log_dashboard(url='http://127.0.0.1:5009'):
 # Example usage (for testing this module directly)
 if __name__ == "__main__":
     start_log_server(port=5009)  # Use a different port
-    import time
     time.sleep(2)
     open_log_dashboard(url='http://127.0.0.1:5009')
     set_url_and_task("https://www.example.com", "Test the URL and task display")
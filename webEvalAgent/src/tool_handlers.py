@@ -12,14 +12,15 @@ from mcp.types import TextContent, ImageContent # Added ImageContent import
 # Import the manager directly
 from webEvalAgent.src.browser_manager import PlaywrightBrowserManager
 # Only import run_browser_task from browser_utils
-from webEvalAgent.src.browser_utils import run_browser_task, console_log_storage, network_request_storage
+from webEvalAgent.src.browser_utils import run_browser_task
 # Import your prompt function
 from webEvalAgent.src.prompts import get_web_evaluation_prompt
 # Import log server functions directly
-from .log_server import send_log, start_log_server, open_log_dashboard, set_url_and_task
+from .log_server import send_log, start_log_server, open_log_dashboard, set_url_and_task, DEBUG_LOGS
 # For sleep
 import asyncio
 import time  # Ensure time is imported at the top level
+from datetime import datetime
 
 # Import playwright directly for browser state setup
 from playwright.async_api import async_playwright
@@ -127,13 +128,16 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context) -> list
         # Extract the final result string
         agent_final_result = agent_result_data.get("result", "No result provided")
         screenshots = agent_result_data.get("screenshots", []) # Added this line
+        console_logs = agent_result_data.get("console_logs", [])
+        network_requests = agent_result_data.get("network_requests", [])
 
         # Log detailed screenshot information
         send_log(f"Received {len(screenshots)} screenshots from run_browser_task", "📸")
         for i, screenshot in enumerate(screenshots):
             if 'screenshot' in screenshot and screenshot['screenshot']:
-                b64_length = len(screenshot['screenshot'])
-                send_log(f"Processing screenshot {i+1}: Step {screenshot.get('step', 'unknown')}, {b64_length} base64 chars", "🔢")
+                if DEBUG_LOGS:
+                    b64_length = len(screenshot['screenshot'])
+                    send_log(f"Processing screenshot {i+1}: Step {screenshot.get('step', 'unknown')}, {b64_length} base64 chars", "🔢")
             else:
                 send_log(f"Screenshot {i+1} missing 'screenshot' data! Keys: {list(screenshot.keys())}", "⚠️")
 
@@ -145,9 +149,11 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context) -> list
         send_log(error_msg, "❌")
         agent_final_result = f"Error: {browser_task_error}" # Provide error as result
         screenshots = [] # Ensure screenshots is defined even on error
+        console_logs = []
+        network_requests = []
 
     # Format the agent result in a more user-friendly way, including console and network errors
-    formatted_result = format_agent_result(agent_final_result, url, task, console_log_storage, network_request_storage)
+    formatted_result = format_agent_result(agent_final_result, url, task, console_logs, network_requests)
     
     # Determine if the task was successful
     task_succeeded = True
@@ -165,7 +171,8 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context) -> list
     send_log(f"Web evaluation task completed for {url}.", status_emoji) # Also send confirmation to dashboard
     
     # Log final screenshot count before constructing response
-    send_log(f"Constructing final response with {len(screenshots)} screenshots", "🧩")
+    if DEBUG_LOGS:
+        send_log(f"Constructing final response with {len(screenshots)} screenshots", "🧩")
     
     # Create the final response structure
     response = [TextContent(type="text", text=confirmation_text)]
@@ -173,8 +180,9 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context) -> list
     # Debug the screenshot data structure one last time before adding to response
     for i, screenshot_data in enumerate(screenshots[1:]):
         if 'screenshot' in screenshot_data and screenshot_data['screenshot']:
-            b64_length = len(screenshot_data['screenshot'])
-            send_log(f"Adding screenshot {i+1} to response ({b64_length} chars)", "➕")
+            if DEBUG_LOGS:
+                b64_length = len(screenshot_data['screenshot'])
+                send_log(f"Adding screenshot {i+1} to response ({b64_length} chars)", "➕")
             response.append(ImageContent(
                 type="image",
                 data=screenshot_data["screenshot"],
@@ -183,10 +191,12 @@ async def handle_web_evaluation(arguments: Dict[str, Any], ctx: Context) -> list
         else:
             send_log(f"Screenshot {i+1} can't be added to response - missing data!", "❌")
     
-    send_log(f"Final response contains {len(response)} items ({len(response)-1} images)", "📦")
+    if DEBUG_LOGS:
+        send_log(f"Final response contains {len(response)} items ({len(response)-1} images)", "📦")
     
     # MCP tool function expects list[list[TextContent, ImageContent]] - see docstring in mcp_server.py
-    send_log(f"Returning wrapped response: list[ [{len(response)} items] ]", "🎁")
+    if DEBUG_LOGS:
+        send_log(f"Returning wrapped response: list[ [{len(response)} items] ]", "🎁")
     
     # return [response]  # This structure may be incorrect
     
@@ -237,10 +247,7 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
         result = f" ({len(items)} items)\n"
         
         # Combine all items with line breaks
-        all_items_text = ""
-        for i, item in enumerate(items):
-            item_line = item_formatter(i, item)
-            all_items_text += item_line
+        all_items_text = "".join(item_formatter(i, item) for i, item in enumerate(items))
             
         # Truncate if necessary and add indicator
         if len(all_items_text) > MAX_ERROR_OUTPUT_CHARS:
@@ -288,7 +295,7 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
             # Get timeframe from console logs
             if console_logs:
                 for log in console_logs:
-                    timestamp = log.get('timestamp', 0)
+                    timestamp = log.timestamp
                     if timestamp > 0:
                         if earliest_browser_time is None or timestamp < earliest_browser_time:
                             earliest_browser_time = timestamp
@@ -298,7 +305,7 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
             # Check network requests too
             if network_requests:
                 for req in network_requests:
-                    timestamp = req.get('timestamp', 0)
+                    timestamp = req.timestamp
                     if timestamp > 0:
                         if earliest_browser_time is None or timestamp < earliest_browser_time:
                             earliest_browser_time = timestamp
@@ -306,7 +313,7 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
                             latest_browser_time = timestamp
                     
                     # Also check response timestamp
-                    resp_timestamp = req.get('response_timestamp', 0)
+                    resp_timestamp = req.response_timestamp or 0
                     if resp_timestamp > 0:
                         if latest_browser_time is None or resp_timestamp > latest_browser_time:
                             latest_browser_time = resp_timestamp
@@ -448,8 +455,8 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
         console_errors = []
         if console_logs:
             for log in console_logs:
-                if log.get('type') == 'error':
-                    console_errors.append(log.get('text', 'Unknown error'))
+                if log.type == 'error':
+                    console_errors.append(log.text)
         
         # Show console errors first (if any)
         if console_errors:
@@ -464,12 +471,12 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
         if network_requests:
             for req in network_requests:
                 # Check if it's an XHR/fetch request and has a failure status code (4xx or 5xx)
-                is_xhr = req.get('resourceType') == 'xhr' or req.get('resourceType') == 'fetch'
-                status = req.get('response_status')
+                is_xhr = req.resource_type == 'xhr' or req.resource_type == 'fetch'
+                status = req.response_status
                 if is_xhr and status and (status >= 400):
                     failed_requests.append({
-                        'url': req.get('url', 'Unknown URL'),
-                        'method': req.get('method', 'GET'),
+                        'url': req.url,
+                        'method': req.method,
                         'status': status
                     })
         
@@ -489,7 +496,7 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
         formatted += "\n🖥️ All Console Logs:"
         formatted += format_error_list(
             all_console_logs,
-            lambda i, log: f"  {i+1}. [{log.get('type', 'log')}] {log.get('text', 'Unknown message')}\n"
+            lambda i, log: f"  {i+1}. [{log.type}] {log.text}\n"
         )
         
         # Finally show all network requests
@@ -500,7 +507,7 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
         formatted += "\n🌐 All Network Requests:"
         formatted += format_error_list(
             all_network_requests,
-            lambda i, req: f"  {i+1}. {req.get('method', 'GET')} {req.get('url', 'Unknown URL')} - Status: {req.get('response_status', 'N/A')}\n"
+            lambda i, req: f"  {i+1}. {req.method} {req.url} - Status: {req.response_status if req.response_status is not None else 'N/A'}\n"
         )
         
         # Add a chronological timeline of all events
@@ -511,9 +518,9 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
         for log in all_console_logs:
             all_events.append({
                 "type": "console",
-                "subtype": log.get('type', 'log'),
-                "text": log.get('text', 'Unknown message'),
-                "timestamp": log.get('timestamp', 0)
+                "subtype": log.type,
+                "text": log.text,
+                "timestamp": log.timestamp
             })
         
         # Add network requests to events
@@ -521,19 +528,19 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
             # Add request
             all_events.append({
                 "type": "network_request",
-                "method": req.get('method', 'GET'),
-                "url": req.get('url', 'Unknown URL'),
-                "timestamp": req.get('timestamp', 0)
+                "method": req.method,
+                "url": req.url,
+                "timestamp": req.timestamp
             })
             
             # Add response if available
-            if 'response_timestamp' in req:
+            if req.response_timestamp is not None:
                 all_events.append({
                     "type": "network_response",
-                    "method": req.get('method', 'GET'),
-                    "url": req.get('url', 'Unknown URL'),
-                    "status": req.get('response_status', 'N/A'),
-                    "timestamp": req.get('response_timestamp', 0)
+                    "method": req.method,
+                    "url": req.url,
+                    "status": req.response_status,
+                    "timestamp": req.response_timestamp
                 })
         
         # Add agent steps to events
@@ -545,45 +552,46 @@ def format_agent_result(result_str: str, url: str, task: str, console_logs=None,
         # Format the timeline
         formatted += "\n\n⏱️ Chronological Timeline of All Events:\n"
         
-        timeline_text = ""
+        timeline_lines = []
         for event in all_events:
             event_type = event.get('type')
             timestamp = event.get('timestamp', 0)
             
             # Format timestamp as HH:MM:SS.ms
-            from datetime import datetime
             time_str = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S.%f')[:-3]
             
             if event_type == 'console':
                 subtype = event.get('subtype', 'log')
                 text = event.get('text', '')
                 emoji = "❌" if subtype == 'error' else "⚠️" if subtype == 'warning' else "🖥️"
-                timeline_text += f"  {time_str} {emoji} Console [{subtype}]: {text}\n"
+                timeline_lines.append(f"  {time_str} {emoji} Console [{subtype}]: {text}\n")
                 
             elif event_type == 'network_request':
                 method = event.get('method', 'GET')
                 url = event.get('url', '')
-                timeline_text += f"  {time_str} ➡️ Network Request: {method} {url}\n"
+                timeline_lines.append(f"  {time_str} ➡️ Network Request: {method} {url}\n")
                 
             elif event_type == 'network_response':
                 method = event.get('method', 'GET')
                 url = event.get('url', '')
                 status = event.get('status', 'N/A')
                 status_emoji = "❌" if str(status).startswith(('4', '5')) else "✅"
-                timeline_text += f"  {time_str} ⬅️ Network Response: {method} {url} - Status: {status} {status_emoji}\n"
+                timeline_lines.append(f"  {time_str} ⬅️ Network Response: {method} {url} - Status: {status} {status_emoji}\n")
                 
             elif event_type == 'agent_step':
                 text = event.get('text', '')
-                timeline_text += f"  {time_str} 🤖 {text}\n"
+                timeline_lines.append(f"  {time_str} 🤖 {text}\n")
                 
             elif event_type == 'agent_error':
                 text = event.get('text', '')
-                timeline_text += f"  {time_str} 🤖 Agent Error: {text}\n"
+                timeline_lines.append(f"  {time_str} 🤖 Agent Error: {text}\n")
                 
             elif event_type == 'conclusion':
                 text = event.get('text', '')
-                timeline_text += f"  {time_str} 🤖 {text}\n"
+                timeline_lines.append(f"  {time_str} 🤖 {text}\n")
         
+        timeline_text = "".join(timeline_lines)
+
         # Truncate if necessary
         if len(timeline_text) > MAX_TIMELINE_CHARS:
             truncated_text = timeline_text[:MAX_TIMELINE_CHARS]